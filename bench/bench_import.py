@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+#
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# For more information, please refer to <http://unlicense.org/>
+#
+
+
+"""
+Benchmark of the module import and of short command line conversions.
+
+Measures the wall time of fresh python processes importing xmlplain,
+and of xmlplain.py command line runs converting tests/example-1.xml
+from XML to XML, which do not need yaml, and from XML to YAML.
+For each measure the modules of interest loaded by the process are
+reported, in order to check that yaml is only imported when needed.
+"""
+
+from __future__ import print_function
+
+import os, sys, time, json, subprocess
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+XMLPLAIN = os.path.join(SRC_DIR, "xmlplain.py")
+EXAMPLE = os.path.join(SRC_DIR, "tests", "example-1.xml")
+
+# Modules of interest reported as loaded or not by each measure
+MODULES = ["yaml", "xml.sax.saxutils", "argparse"]
+
+# Runs the command line main as "python xmlplain.py ..." does, then
+# prints the loaded modules of interest
+CLI_SCRIPT = """
+import sys, runpy
+sys.argv = %r
+try:
+    runpy.run_path(sys.argv[0], run_name="__main__")
+finally:
+    sys.stderr.write(" ".join([name for name in %r if name in sys.modules]) + "\\n")
+"""
+
+IMPORT_SCRIPT = """
+import sys
+sys.path.insert(0, %r)
+import xmlplain
+sys.stderr.write(" ".join([name for name in %r if name in sys.modules]) + "\\n")
+"""
+
+
+def measures():
+    """
+    Returns the list of (name, python script) measures.
+    """
+    cli = lambda *args: CLI_SCRIPT % ([XMLPLAIN] + list(args) + [EXAMPLE, os.devnull], MODULES)
+    return [
+        ("import xmlplain", IMPORT_SCRIPT % (SRC_DIR, MODULES)),
+        ("cli xml to xml", cli("--inf", "xml", "--outf", "xml")),
+        ("cli xml to xml expat/fast", cli("--inf", "xml", "--outf", "xml", "--engine", "expat", "--writer", "fast")),
+        ("cli xml to yml", cli("--inf", "xml", "--outf", "yml")),
+    ]
+
+
+def run_script(script):
+    start = time.time()
+    proc = subprocess.Popen([sys.executable, "-c", script], stderr=subprocess.PIPE)
+    err = proc.communicate()[1]
+    elapsed = time.time() - start
+    if proc.returncode != 0:
+        raise RuntimeError("measure failed: %s" % err.decode("utf-8", "replace"))
+    return elapsed, err.decode("utf-8").split()
+
+
+def run(repeat):
+    # A first run of python alone gives the interpreter startup time
+    for name, script in [("python startup", "pass")] + measures():
+        times, modules = [], []
+        for i in range(repeat):
+            elapsed, modules = run_script(script)
+            times.append(elapsed)
+        times.sort()
+        yield {"measure": name, "best": times[0], "median": times[len(times) // 2],
+               "modules": modules}
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10, help="number of runs per measure (default: 10)")
+    parser.add_argument("--json", action="store_true", help="output results as JSON lines")
+    args = parser.parse_args()
+    if not args.json:
+        print("%-26s %10s %10s  %s" % ("measure", "best(ms)", "median(ms)", "loaded modules"))
+    for result in run(args.repeat):
+        if args.json:
+            print(json.dumps(result, sort_keys=True))
+        else:
+            print("%-26s %10.1f %10.1f  %s" % (result["measure"], result["best"] * 1e3, result["median"] * 1e3,
+                                               " ".join(result["modules"])))
+        sys.stdout.flush()
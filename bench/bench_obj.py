@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+#
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# For more information, please refer to <http://unlicense.org/>
+#
+
+
+"""
+Benchmark of xml_to_obj() on scaled up jenkins samples.
+
+Builds a document repeating the tests/jenkins-sample-*.xml root
+elements a number of times and reports the throughput of the
+events generation, of the plain object building and of the
+whole xml_to_obj() conversion for each strip_space/fold_dict
+combination.
+"""
+
+from __future__ import print_function
+
+import os, sys, re, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import xmlplain
+
+TESTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests")
+
+
+def scaled_jenkins(scale):
+    samples = []
+    for name in ["jenkins-sample-1.xml", "jenkins-sample-2.xml"]:
+        with open(os.path.join(TESTS_DIR, name), "rb") as inf:
+            samples.append(re.sub(b"^<\\?xml[^>]*>", b"", inf.read()))
+    return b"<root>" + b"".join(samples) * scale + b"</root>"
+
+
+def best_time(func, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        func()
+        elapsed = time.time() - start
+        best = elapsed if best == None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=200, help="number of repetitions of the samples (default: 200)")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs per measure (default: 3)")
+    args = parser.parse_args()
+    doc = scaled_jenkins(args.scale)
+    events = xmlplain.xml_to_events(doc)
+    mbytes = len(doc) / 1e6
+    print("document: %.2f MB, %d events" % (mbytes, len(events)))
+    print("%-24s %10s %10s" % ("stage", "time(s)", "MB/s"))
+    for engine in ["sax", "expat"]:
+        elapsed = best_time(lambda: xmlplain.xml_to_events(doc, engine=engine), args.repeat)
+        print("%-24s %10.4f %10.2f" % ("xml_to_events " + engine, elapsed, mbytes / elapsed))
+    for strip_space, fold_dict in [(False, False), (True, False), (True, True)]:
+        label = "strip=%d,fold=%d" % (strip_space, fold_dict)
+        build = lambda: xmlplain._ObjGenerator(strip_space=strip_space, fold_dict=fold_dict)
+        def build_obj():
+            generator = build()
+            for event in events: generator.append(event)
+        elapsed = best_time(build_obj, args.repeat)
+        print("%-24s %10.4f %10.2f" % ("build " + label, elapsed, mbytes / elapsed))
+        elapsed = best_time(lambda: xmlplain.xml_to_obj(doc, strip_space=strip_space, fold_dict=fold_dict), args.repeat)
+        print("%-24s %10.4f %10.2f" % ("xml_to_obj " + label, elapsed, mbytes / elapsed))
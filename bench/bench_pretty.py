@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+#
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# For more information, please refer to <http://unlicense.org/>
+#
+
+"""
+Benchmark of events_filter_pretty() on wide elements.
+
+Times the pretty filter on a leaf element with an increasing number
+of attributes and text chunks. The time per event must stay constant
+as the filter is expected to run in linear time.
+"""
+
+from __future__ import print_function
+
+import os, sys, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import xmlplain
+
+
+def wide_events(width):
+    events = [("[", ("",)), ("<", ("root",)), ("<", ("wide",))]
+    events += [("@", ("attr%d" % i, str(i))) for i in range(width)]
+    events += [("|", ("text %d " % i,)) for i in range(width)]
+    events += [(">", ("wide",)), (">", ("root",)), ("]", ("",))]
+    return events
+
+
+def bench_pretty(width, repeat=3):
+    events = wide_events(width)
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        list(xmlplain.events_filter_pretty(events))
+        elapsed = time.time() - start
+        best = elapsed if best == None else min(best, elapsed)
+    return len(events), best
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-width", type=int, default=256000, help="maximum element width (default: 256000)")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs per width (default: 3)")
+    args = parser.parse_args()
+    print("%10s %10s %10s %12s" % ("width", "events", "time(s)", "ns/event"))
+    width = 1000
+    while width <= args.max_width:
+        count, elapsed = bench_pretty(width, repeat=args.repeat)
+        print("%10d %10d %10.4f %12.1f" % (width, count, elapsed, elapsed * 1e9 / count))
+        width *= 4
@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+#
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# For more information, please refer to <http://unlicense.org/>
+#
+
+
+"""
+Benchmark of each conversion stage on synthetic documents.
+
+Generates documents of different shapes: wide, deep, attribute heavy,
+text heavy, entity heavy and many small documents, and measures
+separately for each of them the time and the peak memory allocated by
+xml_to_events(), xml_to_obj() for each strip_space/fold_dict
+combination, events_filter_pretty(), events_from_obj(), xml_from_events(),
+obj_to_yaml(), obj_from_yaml(), evt_from_events() and evt_to_events().
+
+The results are output as a table or as JSON lines, one object per
+document and stage, which can be given back with --compare in order
+to report the stages slower than the baseline by more than the
+threshold ratio, in which case the exit code is 1.
+"""
+
+from __future__ import print_function
+
+import os, sys, time, json, gc
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import xmlplain
+
+try:
+    import tracemalloc
+except ImportError: # python 2 only
+    tracemalloc = None
+
+
+def wide_doc(size):
+    items = [b'<item id="%d">value %d</item>' % (i, i) for i in range(size)]
+    return [b"<root>" + b"".join(items) + b"</root>"]
+
+
+def deep_doc(size):
+    # Chains of nested elements, bounded in depth for the sax engine
+    depth = 200
+    chain = b"".join([b"<level>" for i in range(depth)]) + b"leaf" + b"</level>" * depth
+    return [b"<root>" + chain * max(1, size // depth) + b"</root>"]
+
+
+def attrs_doc(size):
+    attrs = b" ".join([b'attr%d="value %d"' % (i, i) for i in range(20)])
+    return [b"<root>" + b"".join([b"<item " + attrs + b"/>" for i in range(size // 10)]) + b"</root>"]
+
+
+def text_doc(size):
+    text = b"Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 40
+    return [b"<root>" + b"".join([b"<para>" + text + b"</para>" for i in range(size // 40)]) + b"</root>"]
+
+
+def entities_doc(size):
+    text = b"a &lt; b &amp;&amp; c &gt; d &#233;&#x263a; &quot;e&apos; " * 10
+    return [b"<root>" + b"".join([b"<text>" + text + b"</text>" for i in range(size // 10)]) + b"</root>"]
+
+
+def small_docs(size):
+    return [b'<doc id="%d"><name>doc %d</name><value>%d</value></doc>' % (i, i, i)
+            for i in range(size // 5)]
+
+
+DOCS = [
+    ("wide", wide_doc),
+    ("deep", deep_doc),
+    ("attrs", attrs_doc),
+    ("text", text_doc),
+    ("entities", entities_doc),
+    ("small", small_docs),
+]
+
+
+def stages(docs):
+    """
+    Returns the list of (stage, func, inputs) for the documents list, where
+    func is applied to each of the inputs for the stage measure.
+    """
+    events = [xmlplain.xml_to_events(doc) for doc in docs]
+    objs = [xmlplain.xml_to_obj(doc) for doc in docs]
+    pretty_objs = [xmlplain.xml_to_obj(doc, strip_space=True, fold_dict=True) for doc in docs]
+    ymls = [xmlplain.obj_to_yaml(obj) for obj in pretty_objs]
+    evts = [xmlplain.evt_from_events(evts) for evts in events]
+    result = [
+        ("xml_to_events sax", lambda doc: xmlplain.xml_to_events(doc), docs),
+        ("xml_to_events expat", lambda doc: xmlplain.xml_to_events(doc, engine="expat"), docs),
+    ]
+    for strip_space, fold_dict in [(False, False), (True, False), (False, True), (True, True)]:
+        result.append(("xml_to_obj strip=%d,fold=%d" % (strip_space, fold_dict),
+                       lambda doc, strip_space=strip_space, fold_dict=fold_dict: xmlplain.xml_to_obj(
+                           doc, strip_space=strip_space, fold_dict=fold_dict), docs))
+    result += [
+        ("events_filter_pretty", lambda evts: list(xmlplain.events_filter_pretty(evts)), events),
+        ("events_from_obj", lambda obj: list(xmlplain.events_from_obj(obj)), objs),
+        ("xml_from_events sax", lambda evts: xmlplain.xml_from_events(evts), events),
+        ("xml_from_events fast", lambda evts: xmlplain.xml_from_events(evts, writer="fast"), events),
+        ("obj_to_yaml", lambda obj: xmlplain.obj_to_yaml(obj), pretty_objs),
+        ("obj_from_yaml", lambda yml: xmlplain.obj_from_yaml(yml), ymls),
+        ("evt_from_events", lambda evts: xmlplain.evt_from_events(evts), events),
+        ("evt_to_events", lambda data: xmlplain.evt_to_events(data), evts),
+    ]
+    return result
+
+
+def measure_time(func, inputs, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        for inp in inputs: func(inp)
+        elapsed = time.time() - start
+        best = elapsed if best == None else min(best, elapsed)
+    return best
+
+
+def measure_memory(func, inputs):
+    # Peak of the memory allocated while running the stage, the outputs
+    # being kept such that the result size is accounted for
+    if tracemalloc == None: return None
+    tracemalloc.start()
+    try:
+        outputs = [func(inp) for inp in inputs]
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(names, size, repeat, selected=None):
+    for name, generate in DOCS:
+        if names and name not in names: continue
+        docs = generate(size)
+        nbytes = sum([len(doc) for doc in docs])
+        nevents = sum([len(xmlplain.xml_to_events(doc)) for doc in docs])
+        for stage, func, inputs in stages(docs):
+            if selected and stage.split()[0] not in selected and stage not in selected: continue
+            gc.collect()
+            elapsed = measure_time(func, inputs, repeat)
+            gc.collect()
+            peak = measure_memory(func, inputs)
+            yield {"doc": name, "stage": stage, "docs": len(docs), "bytes": nbytes,
+                   "events": nevents, "time": elapsed, "mbps": nbytes / 1e6 / elapsed,
+                   "peak_bytes": peak}
+
+
+def compare(results, baseline_file, threshold):
+    """
+    Prints the stages slower than the baseline by more than the threshold
+    ratio and returns their number.
+    """
+    baseline = {}
+    with open(baseline_file) as inf:
+        for line in inf:
+            if line.strip():
+                result = json.loads(line)
+                baseline[(result["doc"], result["stage"])] = result
+    regressions = 0
+    for result in results:
+        base = baseline.get((result["doc"], result["stage"]))
+        if base == None: continue
+        ratio = result["time"] / base["time"]
+        if ratio > threshold:
+            regressions += 1
+            print("regression: %s %s: %.4fs vs %.4fs (x%.2f)" % (
+                result["doc"], result["stage"], result["time"], base["time"], ratio), file=sys.stderr)
+    return regressions
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=20000, help="scale of the generated documents, the number of elements of the wide document (default: 20000)")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs per measure (default: 3)")
+    parser.add_argument("--docs", nargs="+", help="documents to generate, among: %s (default: all)" % ", ".join([name for name, generate in DOCS]))
+    parser.add_argument("--stages", nargs="+", help="stages to measure, by function name or full stage name (default: all)")
+    parser.add_argument("--json", action="store_true", help="output results as JSON lines")
+    parser.add_argument("--output", help="output file (default: stdout)")
+    parser.add_argument("--compare", help="JSON lines results file of a baseline run")
+    parser.add_argument("--threshold", type=float, default=1.2, help="time ratio over the baseline reported as a regression (default: 1.2)")
+    args = parser.parse_args()
+    outf = open(args.output, "w") if args.output else sys.stdout
+    if not args.json:
+        print("%-9s %-28s %10s %10s %12s" % ("doc", "stage", "time(s)", "MB/s", "peak(MB)"), file=outf)
+    results = []
+    for result in run(args.docs, args.size, args.repeat, args.stages):
+        results.append(result)
+        if args.json:
+            print(json.dumps(result, sort_keys=True), file=outf)
+        else:
+            peak = result["peak_bytes"] / 1e6 if result["peak_bytes"] != None else float("nan")
+            print("%-9s %-28s %10.4f %10.2f %12.2f" % (result["doc"], result["stage"], result["time"],
+                                                       result["mbps"], peak), file=outf)
+        outf.flush()
+    if outf is not sys.stdout: outf.close()
+    if args.compare and compare(results, args.compare, args.threshold) > 0:
+        sys.exit(1)
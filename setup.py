@@ -28,10 +28,16 @@
 
 from setuptools import setup
 
+import sys
 import xmlplain
 with open('README.md', 'r') as fh:
     long_description = fh.read()
 
+# The asyncio functions module requires python 3.7 or later
+py_modules = ['xmlplain']
+if sys.version_info >= (3, 7):
+    py_modules.append('xmlplain_async')
+
 # Setup the package
 setup(
     name='xmlplain',
@@ -56,7 +62,7 @@ setup(
         'Programming Language :: Python :: 3.6',
         'Topic :: Text Processing :: Markup :: XML',
     ],
-    py_modules=['xmlplain'],
+    py_modules=py_modules,
     install_requires=[
         'ordereddict', 'PyYAML'
     ]
@@ -112,99 +112,1336 @@ from __future__ import print_function
 
 __version__ = '1.6.0'
 
-import yaml, sys, xml, io
+# yaml and xml.sax.saxutils, which are slow to import, are imported on
+# first use such that the XML only conversions do not pay their cost
+import sys, xml, io, os, re
+import array
+import codecs
 import contextlib
-import xml.sax.saxutils
+import mmap
+import time
+import xml.sax
+import xml.parsers.expat
 try:
     from collections import OrderedDict
 except ImportError: # pragma: no cover # python 2.6 only
     from ordereddict import OrderedDict
+try:
+    from collections.abc import Mapping
+except ImportError: # pragma: no cover # python 2 only
+    from collections import Mapping
+
 
+_compressions = OrderedDict([
+    ("gzip", ".gz"),
+    ("bz2", ".bz2"),
+    ("xz", ".xz"),
+])
 
-def xml_to_events(inf, handler=None, encoding="UTF-8", process_content=None):
+
+def _compression_from_magic(data):
     """
-    Generates XML events tuples from the input stream.
+    Returns the compression format of the given leading bytes or None.
+    """
+    if data[:2] == b"\x1f\x8b":
+        return "gzip"
+    if data[:6] == b"\xfd7zXZ\x00":
+        return "xz"
+    # bz2 magic is short, check also the first block or end of stream magic
+    if (data[:3] == b"BZh" and data[3:4] in b"123456789" and
+        data[4:10] in [b"1AY&SY", b"\x17rE8P\x90"]):
+        return "bz2"
+    return None
+
+
+def compression_from_name(name):
+    """
+    Returns the compression format for the given file name extension.
 
-    The generated events consist of pairs: (type, value)
-    where type is a single char identifier for the event and
-    value is a variable length tuple.
-    Events correspond to xml.sax events with the exception that
-    attributes are generated as events instead of being part of
-    the start element event.
-    The XML stresm is parsed with xml.sax.make_parser().
+    :param name: the file name
+    :return: one of: gzip, bz2, xz or None if not compressed
 
-    :param inf: input stream file or string or bytestring
-    :param handler: events receiver implementing the append() method or None,
-      in which case a new list will be generated
-    :param encoding: encoding used whebn the input is a bytes string
-    :param process_content: a function to apply to the cdata content (str for
-        python3 or unicode for python2) after the XML reader content generation
+    :Example:
 
-    :return: returns the handler or the generated list
+    >>> import xmlplain
+    >>> xmlplain.compression_from_name("archive.xml.gz")
+    'gzip'
+    >>> xmlplain.compression_from_name("archive.xml") is None
+    True
+    """
+    for compression, ext in _compressions.items():
+        if name.endswith(ext):
+            return compression
+    return None
 
-    The defined XML events tuples in this module are:
 
-    - ("[", ("",)) for the document start
-    - ("]", ("",)) for the document end
-    - ("<", (elt_name,)) for an element start
-    - (">", (elt_name,)) for an element end
-    - ("@", (attr_name, attr_value)) for an attribute associated to the
-      last start element
-    - ("|", (content,)) for a CDATA string content
-    - ("#", (whitespace,)) for an ignorable whitespace string
+def _compressed_stream(target, mode, compression):
+    """
+    Returns the binary compressing/decompressing stream over target.
+
+    The target is either a binary file stream or a file name, in which
+    case the file is closed with the returned stream.
+    """
+    if compression == "gzip":
+        import gzip
+        if hasattr(target, 'read') or hasattr(target, 'write'):
+            return gzip.GzipFile(fileobj=target, mode=mode)
+        return gzip.GzipFile(target, mode=mode)
+    elif compression == "bz2":
+        import bz2
+        return bz2.BZ2File(target, mode)
+    elif compression == "xz":
+        try:
+            import lzma
+        except ImportError: # pragma: no cover # python 2 only
+            raise ValueError("compression not available: %s" % compression)
+        return lzma.LZMAFile(target, mode)
+    raise ValueError("invalid compression: %s" % compression)
+
+
+def open_compressed(filename, mode="rb", compression="auto"):
+    """
+    Opens a possibly compressed file as a binary stream.
+
+    The returned stream compresses on write or decompresses on read
+    chunk by chunk, hence can be passed as is to the functions of this
+    module, for instance to xml_to_obj() or xml_from_obj().
+
+    :param filename: the file name
+    :param mode: the opening mode, one of: rb, wb, ab
+    :param compression: one of: auto, none, gzip, bz2, xz, where "auto"
+      detects the format from the magic bytes when reading and from
+      the file name extension when writing
+
+    :return: the opened binary stream
+
+    .. seealso: compression_from_name()
+    """
+    if mode not in ["rb", "wb", "ab"]:
+        raise ValueError("invalid mode for compressed file: %s" % mode)
+    if compression == "auto":
+        if mode == "rb":
+            with open(filename, "rb") as inf:
+                compression = _compression_from_magic(inf.read(10))
+        else:
+            compression = compression_from_name(filename)
+    if compression in [None, "none"]:
+        return open(filename, mode)
+    if compression not in _compressions:
+        raise ValueError("invalid compression: %s" % compression)
+    return _compressed_stream(filename, mode, compression)
+
+
+# Binary inputs parsed in place through memoryview slices
+_buffer_types = (bytearray, memoryview, mmap.mmap)
+
+# Size of the memoryview slices fed to the parser for binary inputs
+_buffer_chunk_size = 1024 * 1024
+
+
+class _BufferStream():
+    """
+    Binary stream reading a binary buffer by memoryview slices.
+
+    Allows to parse a binary buffer in place from a SAX InputSource
+    byte stream, which applies the InputSource encoding.
+    Each slice is released by the next read() or by close(), such that
+    a memory map can be closed after parsing it, even on parsing errors.
+    With python2, where the parsers and decoders don't accept memoryview,
+    bytestring copies of the slices are read instead.
+    """
+    def __init__(self, data):
+        self.data = memoryview(data) if sys.version_info[0] >= 3 else data
+        self.pos = 0
+        self.chunk = None
+
+    def read(self, size=-1):
+        start = self.pos
+        self.pos = len(self.data) if size < 0 else min(start + size, len(self.data))
+        self.release()
+        chunk = self.data[start:self.pos]
+        if sys.version_info[0] == 2:
+            return chunk.tobytes() if isinstance(chunk, memoryview) else bytes(chunk)
+        self.chunk = chunk
+        return chunk
+
+    def release(self):
+        if self.chunk is not None:
+            self.chunk.release()
+            self.chunk = None
+
+    def close(self):
+        self.release()
+        if sys.version_info[0] >= 3: self.data.release()
+
+
+def _is_path(inf):
+    """
+    Returns True when the input is a file path object, i.e. os.PathLike,
+    or a pathlib path for python < 3.6 where it has no __fspath__().
+    """
+    if hasattr(inf, '__fspath__'): return True
+    # A pathlib path only exists when pathlib was already imported
+    pathlib = sys.modules.get("pathlib")
+    return pathlib != None and isinstance(inf, pathlib.PurePath)
+
+
+def _fspath(path):
+    """
+    Returns the file system path string of the file path object.
+    """
+    return path.__fspath__() if hasattr(path, '__fspath__') else str(path)
+
+
+@contextlib.contextmanager
+def _mapped_input(path):
+    """
+    Opens the file path input as a read-only memory map of the file.
+
+    A compressed file is opened as a decompressing stream instead, and
+    a file which can't be mapped, for instance an empty file, as
+    a binary stream.
+    """
+    with open(_fspath(path), "rb") as inf:
+        data = _decompressed_input(inf)
+        if data is inf:
+            try:
+                data = mmap.mmap(inf.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, EnvironmentError):
+                pass
+        try:
+            yield data
+        finally:
+            if data is not inf: data.close()
+
+
+def _decompressed_input(inf):
+    """
+    Returns the decompressing stream for a compressed input or the input as is.
+
+    Compression is detected from the magic bytes of bytestrings, of
+    binary buffers and of binary streams which support peek().
+    """
+    if isinstance(inf, bytes) or isinstance(inf, _buffer_types):
+        magic = inf[:10]
+        compression = _compression_from_magic(magic.tobytes() if isinstance(magic, memoryview) else bytes(magic))
+        if compression != None:
+            return _compressed_stream(io.BytesIO(inf), "rb", compression)
+    elif hasattr(inf, 'peek'):
+        data = inf.peek(10)
+        if isinstance(data, bytes):
+            compression = _compression_from_magic(data[:10])
+            if compression != None:
+                return _compressed_stream(inf, "rb", compression)
+    return inf
+
+
+# Clocks of the Stats wall and CPU times
+_wall_clock = getattr(time, "perf_counter", time.time)
+_cpu_clock = getattr(time, "process_time", getattr(time, "clock", time.time))
+
+
+class Stats():
+    """
+    Collector of statistics on the conversions.
+
+    A Stats object can be passed as the stats option of the conversion
+    functions of this module, which record into it:
+
+    - stages: the wall and CPU times in seconds spent in each stage of
+      the conversions, among: parse (XML parser), handler (events receiver
+      of xml_to_events()), build (plain object building), from_obj
+      (events_from_obj()), pretty (events_filter_pretty()), write
+      (XML writer), yaml_load (YAML parser), yaml_dump (YAML emitter) and
+      cache (xml_to_obj() cache lookup and store)
+    - events_in, events_out: the number of XML events by kind, parsed
+      and written respectively
+    - bytes_in, bytes_out: the size of the input and of the output,
+      in characters for strings and text streams
+    - max_depth: the maximum depth of the elements
+    - max_text: the size of the largest text content
+    - peak_memory: the peak of the memory allocated during the conversions,
+      when traced, or None
+
+    The statistics are accumulated over the conversions using the same
+    Stats object. Note that collecting the statistics slows down the
+    conversions, the time spent in each stage being measured per event.
+
+    The generators iter_xml_events(), iter_xml_objs(), iter_xml_children()
+    and the binary events format functions take no stats option, as the
+    time of their stages would include the processing of the generated
+    items by the caller.
+
+    :param trace_memory: when True, trace the memory allocations with
+      tracemalloc, not available with python2, for the peak memory
+      measure, which slows down the conversions further
+
+    :Example:
+
+    >>> import xmlplain
+    >>> stats = xmlplain.Stats()
+    >>> root = xmlplain.xml_to_obj('<doc><a>text</a><b/></doc>', stats=stats)
+    >>> list(stats.stages.keys())
+    ['parse', 'build']
+    >>> sorted(stats.events_in.items())
+    [('<', 3), ('>', 3), ('[', 1), (']', 1), ('|', 1)]
+    >>> stats.bytes_in, stats.max_depth, stats.max_text
+    (26, 2, 4)
+
+    .. seealso: Stats.as_dict(), Stats.dump()
+    """
+    def __init__(self, trace_memory=False):
+        self.stages = OrderedDict()
+        self.events_in = {}
+        self.events_out = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.max_depth = 0
+        self.max_text = 0
+        self.peak_memory = None
+        self.trace_memory = trace_memory
+        self.stage = None
+        self.clocks = None
+        self.level = 0
+    def switch(self, stage):
+        """
+        Charges the times since the last switch to the current stage and
+        makes stage the current one, returns the previous current stage.
+        """
+        clocks = (_wall_clock(), _cpu_clock())
+        if self.stage != None:
+            times = self.stages.get(self.stage)
+            if times == None:
+                times = self.stages[self.stage] = [0.0, 0.0]
+            times[0] += clocks[0] - self.clocks[0]
+            times[1] += clocks[1] - self.clocks[1]
+        previous, self.stage, self.clocks = self.stage, stage, clocks
+        return previous
+    @contextlib.contextmanager
+    def measure(self, stage):
+        """
+        Context of a conversion stage, the memory being traced for the
+        outermost one.
+        """
+        tracing = self.trace_memory and self.level == 0
+        if tracing:
+            try:
+                import tracemalloc
+            except ImportError: # pragma: no cover
+                tracing = False # Python 2 has no tracemalloc, the peak memory stays None
+        if tracing:
+            started = not tracemalloc.is_tracing()
+            if started: tracemalloc.start()
+        self.level += 1
+        previous = self.switch(stage)
+        try:
+            yield self
+        finally:
+            self.switch(previous)
+            self.level -= 1
+            if tracing:
+                peak = tracemalloc.get_traced_memory()[1]
+                if started: tracemalloc.stop()
+                self.peak_memory = max(peak, self.peak_memory or 0)
+    def as_dict(self):
+        """
+        Returns the statistics as a dict.
+        """
+        return {
+            "stages": OrderedDict([(stage, {"wall": times[0], "cpu": times[1]})
+                                   for stage, times in self.stages.items()]),
+            "events_in": dict(self.events_in),
+            "events_out": dict(self.events_out),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "max_depth": self.max_depth,
+            "max_text": self.max_text,
+            "peak_memory": self.peak_memory,
+        }
+    def dump(self, outf=None):
+        """
+        Prints the statistics to outf, default to stderr.
+        """
+        if outf == None: outf = sys.stderr
+        for stage, times in self.stages.items():
+            print("stage %s: wall %.6fs, cpu %.6fs" % (stage, times[0], times[1]), file=outf)
+        for name, counts in [("in", self.events_in), ("out", self.events_out)]:
+            if counts:
+                print("events %s: %d (%s)" % (name, sum(counts.values()), ", ".join(
+                    ["%s %d" % (kind, counts[kind]) for kind in EventBuffer.event_kinds
+                     if kind in counts])), file=outf)
+        print("bytes in: %d, out: %d" % (self.bytes_in, self.bytes_out), file=outf)
+        print("max depth: %d, max text: %d" % (self.max_depth, self.max_text), file=outf)
+        if self.peak_memory != None:
+            print("peak memory: %d" % self.peak_memory, file=outf)
+
+
+class _StatsHandler():
+    """
+    Events receiver recording the events statistics into stats before
+    passing the events to the handler, the time spent in the handler
+    being charged to the given stage.
+    """
+    def __init__(self, stats, handler, stage, counts):
+        self.stats = stats
+        self.handler = handler
+        self.stage = stage
+        self.counts = counts
+        self.depth = 0
+        self.text = 0
+    def append(self, event):
+        kind = event[0]
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        if kind == '|':
+            # Consecutive contents are parts of the same text
+            self.text += len(event[1][0])
+            if self.text > self.stats.max_text: self.stats.max_text = self.text
+        else:
+            self.text = 0
+            if kind == '<':
+                self.depth += 1
+                if self.depth > self.stats.max_depth: self.stats.max_depth = self.depth
+            elif kind == '>':
+                self.depth -= 1
+        previous = self.stats.switch(self.stage)
+        self.handler.append(event)
+        self.stats.switch(previous)
+
+
+class _StatsStream():
+    """
+    Stream proxy recording the size of the data read or written into stats.
+    """
+    def __init__(self, stream, stats):
+        self.stream = stream
+        self.stats = stats
+    def read(self, *args):
+        data = self.stream.read(*args)
+        self.stats.bytes_in += len(data)
+        return data
+    def write(self, data):
+        self.stats.bytes_out += len(data)
+        return self.stream.write(data)
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def _stats_input(inf, stats):
+    """
+    Returns the input recording the size of the data read into stats.
+    """
+    if _is_path(inf):
+        stats.bytes_in += os.path.getsize(_fspath(inf))
+    elif hasattr(inf, 'read'):
+        return _StatsStream(inf, stats)
+    else:
+        stats.bytes_in += len(inf)
+    return inf
+
 
-    .. seealso: xml_from_events(), xml.sax.parse()
+def _iter_stats_stage(stats, stage, events):
+    """
+    Generates the events from the iterable, the time spent in the
+    iterable being charged to the given stage.
+    """
+    events = iter(events)
+    while True:
+        previous = stats.switch(stage)
+        event = next(events, None)
+        stats.switch(previous)
+        if event == None: break
+        yield event
+
+
+@contextlib.contextmanager
+def _stats_measure(stats, stage):
+    """
+    Context of a conversion stage for stats, which may be None.
+    """
+    if stats == None:
+        yield
+    else:
+        with stats.measure(stage):
+            yield
+
+
+def _xml_sax_parser(handler, process_content=None, coalesce=False):
+    """
+    Returns a SAX parser generating XML events tuples to the handler.
+
+    The parser is configured for the events generation as specified
+    in xml_to_events() and refuses system external entities.
     """
     class EventGenerator(xml.sax.ContentHandler):
-        def __init__(self, handler, process_content=None):
+        def __init__(self, handler, process_content=None, coalesce=False):
             self.handler = handler
             self.process_content = process_content
+            self.coalesce = coalesce
+            self.text = []
+        def flush_text(self):
+            if len(self.text) == 0: return
+            content = "".join(self.text)
+            del self.text[:]
+            if self.process_content != None:
+                content = self.process_content(content)
+            self.handler.append(("|", (content,)))
         def startElement(self, name, attrs):
+            self.flush_text()
             self.handler.append(("<", (name,)))
             # Enforce a stable order as sax attributes are unordered
             for attr in sorted(attrs.keys()):
-                handler.append(("@", (attr, attrs[attr])))
+                self.handler.append(("@", (attr, attrs[attr])))
         def endElement(self, name):
+            self.flush_text()
             self.handler.append((">", (name,)))
         def startDocument(self):
             self.handler.append(("[", ("",)))
         def endDocument(self):
+            self.flush_text()
             self.handler.append(("]", ("",)))
         def characters(self, content):
+            if self.coalesce:
+                self.text.append(content)
+                return
             if self.process_content != None:
                 content = self.process_content(content)
             self.handler.append(("|", (content,)))
     class EntityResolver(xml.sax.handler.EntityResolver):
         def resolveEntity(self, publicId, systemId):
             raise Exception("invalid system entity found: (%s, %s)" % (publicId, systemId))
-    if handler == None: handler = []
     parser = xml.sax.make_parser()
     parser.setFeature(xml.sax.handler.feature_namespaces, False)
     parser.setFeature(xml.sax.handler.feature_namespace_prefixes, False)
     parser.setFeature(xml.sax.handler.feature_external_ges, True)
+    try:
+        # Share a single string for each distinct element or attribute name
+        parser.setFeature(xml.sax.handler.feature_string_interning, True)
+    except (xml.sax.SAXNotRecognizedException, xml.sax.SAXNotSupportedException): # pragma: no cover
+        pass
     parser.setEntityResolver(EntityResolver())
-    parser.setContentHandler(EventGenerator(handler, process_content=process_content))
+    parser.setContentHandler(EventGenerator(handler, process_content=process_content,
+                                            coalesce=coalesce))
+    return parser
+
+
+def _xml_expat_parser(handler, encoding=None, process_content=None, coalesce=False, system_id=None):
+    """
+    Returns an expat based parser generating XML events tuples to the handler.
+
+    This is the direct expat engine for xml_to_events(), bypassing the
+    xml.sax layers. The returned parser implements the feed() and close()
+    methods of xml.sax.xmlreader.IncrementalParser and generates the
+    same events stream and exceptions as the parser from _xml_sax_parser().
+    """
+    class ExpatEventGenerator(xml.sax.xmlreader.Locator):
+        def __init__(self, handler, encoding=None, process_content=None, coalesce=False, system_id=None):
+            self.handler = handler
+            self.process_content = process_content
+            self.coalesce = coalesce
+            self.system_id = system_id
+            self.text = []
+            self.started = False
+            # Share a single string for each distinct element or attribute name
+            self.parser = xml.parsers.expat.ParserCreate(encoding, intern={})
+            self.parser.ordered_attributes = True
+            self.parser.buffer_text = coalesce
+            self.parser.StartElementHandler = self.start_element
+            self.parser.EndElementHandler = self.end_element
+            self.parser.CharacterDataHandler = self.characters
+            self.parser.ExternalEntityRefHandler = self.external_entity_ref
+            self.parser.SetParamEntityParsing(
+                xml.parsers.expat.XML_PARAM_ENTITY_PARSING_UNLESS_STANDALONE)
+        def getSystemId(self):
+            return self.system_id
+        def getPublicId(self):
+            return None
+        def getLineNumber(self):
+            return self.parser.ErrorLineNumber
+        def getColumnNumber(self):
+            return self.parser.ErrorColumnNumber
+        def flush_text(self):
+            if len(self.text) == 0: return
+            content = "".join(self.text)
+            del self.text[:]
+            if self.process_content != None:
+                content = self.process_content(content)
+            self.handler.append(("|", (content,)))
+        def start_element(self, name, attrs):
+            if self.text: self.flush_text()
+            append = self.handler.append
+            append(("<", (name,)))
+            if attrs:
+                attrs = list(zip(attrs[0::2], attrs[1::2]))
+                # Enforce the same stable order as the sax engine
+                if len(attrs) > 1: attrs.sort()
+                for attr in attrs: append(("@", attr))
+        def end_element(self, name):
+            if self.text: self.flush_text()
+            self.handler.append((">", (name,)))
+        def characters(self, content):
+            if self.coalesce:
+                self.text.append(content)
+                return
+            if self.process_content != None:
+                content = self.process_content(content)
+            self.handler.append(("|", (content,)))
+        def external_entity_ref(self, context, base, systemId, publicId):
+            raise Exception("invalid system entity found: (%s, %s)" % (publicId, systemId))
+        def feed(self, data, isFinal=False):
+            if not self.started:
+                self.started = True
+                self.handler.append(("[", ("",)))
+            try:
+                self.parser.Parse(data, isFinal)
+            except xml.parsers.expat.error as e:
+                raise xml.sax.SAXParseException(xml.parsers.expat.ErrorString(e.code), e, self)
+        def close(self):
+            self.feed(b"", True)
+            self.flush_text()
+            self.handler.append(("]", ("",)))
+    return ExpatEventGenerator(handler, encoding=encoding, process_content=process_content,
+                               coalesce=coalesce, system_id=system_id)
+
+
+def _xml_events_parser(handler, engine="sax", encoding=None, process_content=None, coalesce=False, system_id=None):
+    """
+    Returns the incremental parser for the given engine, one of: sax, expat.
+
+    When encoding is given, it overrides the document encoding for the
+    binary data fed to the parser.
+    """
+    if engine == "sax":
+        parser = _xml_sax_parser(handler, process_content=process_content,
+                                 coalesce=coalesce)
+        if encoding != None:
+            # The sax reader creates its expat parser on the first feed()
+            # with the encoding of its current input source
+            parser._source.setEncoding(encoding)
+        return parser
+    elif engine == "expat":
+        return _xml_expat_parser(handler, encoding=encoding,
+                                 process_content=process_content,
+                                 coalesce=coalesce, system_id=system_id)
+    raise ValueError("invalid XML parser engine: %s" % engine)
+
+
+def _iter_xml_chunks(inf, chunk_size=65536):
+    """
+    Generates the successive chunks of data to be fed to the XML parser.
+
+    Strings, bytestrings and binary buffers are sliced in chunks, binary
+    chunks being only valid until the next one is generated, and file
+    streams are read by chunks. The chunks are passed as is to the parser,
+    which decodes the binary data as done by xml_to_events().
+    """
+    if isinstance(inf, bytes) or isinstance(inf, _buffer_types):
+        stream = _BufferStream(inf)
+        try:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk: break
+                yield chunk
+        finally:
+            stream.close()
+    elif hasattr(inf, 'read'):
+        while True:
+            chunk = inf.read(chunk_size)
+            if not chunk: break
+            yield chunk
+    else:
+        for start in range(0, len(inf), chunk_size):
+            yield inf[start:start + chunk_size]
+
+
+def xml_to_events(inf, handler=None, encoding="UTF-8", process_content=None, coalesce=False, engine="sax",
+                  stats=None):
+    """
+    Generates XML events tuples from the input stream.
+
+    The generated events consist of pairs: (type, value)
+    where type is a single char identifier for the event and
+    value is a variable length tuple.
+    Events correspond to xml.sax events with the exception that
+    attributes are generated as events instead of being part of
+    the start element event.
+    The XML stresm is parsed with xml.sax.make_parser(), or when
+    the "expat" engine is selected, directly with the xml.parsers.expat
+    parser which is faster and generates the same events.
+
+    :param inf: input stream file or string or bytestring or binary buffer
+      (bytearray, memoryview, mmap) or file path object (pathlib.Path),
+      binary input may be gzip, bz2 or xz compressed
+    :param handler: events receiver implementing the append() method or None,
+      in which case a new list will be generated
+    :param encoding: encoding used when the input is a bytes string or buffer
+    :param process_content: a function to apply to the cdata content (str for
+        python3 or unicode for python2) after the XML reader content generation
+    :param coalesce: when True, consecutive contents generated by the XML
+      reader are joined and generated as a single content event
+    :param engine: the XML parser engine, one of: sax, expat (default: sax)
+    :param stats: optional Stats object recording the conversion statistics
+
+    :return: returns the handler or the generated list
+
+    The defined XML events tuples in this module are:
+
+    - ("[", ("",)) for the document start
+    - ("]", ("",)) for the document end
+    - ("<", (elt_name,)) for an element start
+    - (">", (elt_name,)) for an element end
+    - ("@", (attr_name, attr_value)) for an attribute associated to the
+      last start element
+    - ("|", (content,)) for a CDATA string content
+    - ("#", (whitespace,)) for an ignorable whitespace string
+
+    Note that the XML reader may split a text content into several
+    content events, for instance around entities, use the coalesce
+    option in order to get a single content event for each text content.
+
+    Compressed bytestrings and binary streams are detected from their
+    magic bytes and decompressed on the fly while parsing,
+    use open_compressed() for writing compressed outputs.
+
+    Binary buffers are fed to the parser by slices without copying them,
+    and file paths are parsed from a memory map of the file, hence
+    the input data is not duplicated in memory. Note that plain strings
+    are XML contents, file names must be passed as pathlib.Path objects.
+
+    :Example:
+
+    >>> import xmlplain
+    >>> xmlplain.xml_to_events('<doc>x &amp; y</doc>')
+    [('[', ('',)), ('<', ('doc',)), ('|', ('x ',)), ('|', ('&',)), ('|', (' y',)), ('>', ('doc',)), (']', ('',))]
+    >>> xmlplain.xml_to_events('<doc>x &amp; y</doc>', coalesce=True)
+    [('[', ('',)), ('<', ('doc',)), ('|', ('x & y',)), ('>', ('doc',)), (']', ('',))]
+    >>> xmlplain.xml_to_events(bytearray(b'<doc>text</doc>'))
+    [('[', ('',)), ('<', ('doc',)), ('|', ('text',)), ('>', ('doc',)), (']', ('',))]
+    >>> import pathlib
+    >>> events = xmlplain.xml_to_events(pathlib.Path("tests/example-1.xml"))
+    >>> events == xmlplain.xml_to_events(open("tests/example-1.xml", "rb"))
+    True
+
+    .. seealso: iter_xml_events(), xml_from_events(), xml.sax.parse()
+    """
+    if handler == None: handler = []
+    if stats != None:
+        # The handler may be already wrapped for charging another stage
+        if not isinstance(handler, _StatsHandler):
+            handler = _StatsHandler(stats, handler, "handler", stats.events_in)
+        with stats.measure("parse"):
+            xml_to_events(_stats_input(inf, stats), handler, encoding=encoding, process_content=process_content,
+                          coalesce=coalesce, engine=engine)
+        return handler.handler
+    if _is_path(inf):
+        # As for file streams, the mapped file encoding is the document one
+        with _mapped_input(inf) as data:
+            return xml_to_events(data, handler, encoding=None,
+                                 process_content=process_content,
+                                 coalesce=coalesce, engine=engine)
+    inf = _decompressed_input(inf)
+    if isinstance(inf, _buffer_types) and engine == "sax":
+        parser = _xml_sax_parser(handler, process_content=process_content,
+                                 coalesce=coalesce)
+        src = xml.sax.xmlreader.InputSource()
+        src.setEncoding(encoding)
+        src.setByteStream(_BufferStream(inf))
+        try:
+            parser.parse(src)
+        finally:
+            src.getByteStream().close()
+        return handler
+    if isinstance(inf, _buffer_types):
+        parser = _xml_events_parser(handler, engine=engine, encoding=encoding,
+                                    process_content=process_content,
+                                    coalesce=coalesce)
+        stream = _BufferStream(inf)
+        try:
+            chunk = stream.read(_buffer_chunk_size)
+            parser.feed(chunk)
+            while chunk:
+                chunk = stream.read(_buffer_chunk_size)
+                if chunk: parser.feed(chunk)
+            parser.close()
+        finally:
+            stream.close()
+        return handler
     if sys.version_info[0] == 2 and isinstance(inf, unicode):
         inf = inf.encode(encoding)
     if sys.version_info[0] >= 3 and isinstance(inf, str):
         inf = inf.encode(encoding)
+    if engine == "sax":
+        parser = _xml_sax_parser(handler, process_content=process_content,
+                                 coalesce=coalesce)
+        if isinstance(inf, bytes):
+            src = xml.sax.xmlreader.InputSource()
+            src.setEncoding(encoding)
+            src.setByteStream(io.BytesIO(inf))
+            parser.parse(src)
+        else:
+            parser.parse(inf)
+        return handler
     if isinstance(inf, bytes):
-        src = xml.sax.xmlreader.InputSource()
-        src.setEncoding(encoding)
-        src.setByteStream(io.BytesIO(inf))
-        parser.parse(src)
+        parser = _xml_events_parser(handler, engine=engine, encoding=encoding,
+                                    process_content=process_content,
+                                    coalesce=coalesce)
+        parser.feed(inf)
     else:
-        parser.parse(inf)
+        system_id = getattr(inf, 'name', None)
+        parser = _xml_events_parser(handler, engine=engine,
+                                    process_content=process_content,
+                                    coalesce=coalesce,
+                                    system_id=system_id if isinstance(system_id, str) else None)
+        for chunk in _iter_xml_chunks(inf): parser.feed(chunk)
+    parser.close()
     return handler
 
 
-def xml_from_events(events, outf=None, encoding='UTF-8', process_content=None):
+def iter_xml_events(inf, encoding="UTF-8", process_content=None, coalesce=False, chunk_size=65536, engine="sax"):
+    """
+    Generates XML events tuples from the input stream as they are parsed.
+
+    This is the pull-based variant of xml_to_events(): the input is
+    fed incrementally by chunks to the parser and the events are
+    yielded as soon as a chunk is parsed, hence the memory
+    used is bounded by the chunk size instead of the document size.
+
+    The generated events are the same as the ones from xml_to_events(),
+    except that without the coalesce option, the XML reader may split the
+    text contents in more content events at the chunks boundaries.
+    The returned iterator is suitable for instance for xml_from_events()
+    or events_filter_pretty().
+
+    :param inf: input stream file or string or bytestring or binary buffer
+      (bytearray, memoryview, mmap) or file path object (pathlib.Path),
+      binary input may be gzip, bz2 or xz compressed
+    :param encoding: encoding used when the input is a bytes string or buffer
+    :param process_content: a function to apply to the cdata content (str for
+        python3 or unicode for python2) after the XML reader content generation
+    :param coalesce: when True, consecutive contents generated by the XML
+      reader are joined and generated as a single content event
+    :param chunk_size: size of the chunks read from the input and fed to
+      the parser
+    :param engine: the XML parser engine, one of: sax, expat (default: sax)
+
+    :return: an iterator over the XML events tuples
+
+    :Example:
+
+    >>> import xmlplain
+    >>> for event in xmlplain.iter_xml_events('<doc kind="example">text</doc>', chunk_size=8):
+    ...     print(event)
+    ('[', ('',))
+    ('<', ('doc',))
+    ('@', ('kind', 'example'))
+    ('|', ('text',))
+    ('>', ('doc',))
+    (']', ('',))
+
+    .. seealso: xml_to_events(), xml.sax.xmlreader.IncrementalParser
+    """
+    if _is_path(inf):
+        with _mapped_input(inf) as data:
+            # The map slices are released before closing the map
+            with contextlib.closing(iter_xml_events(data, encoding=None, process_content=process_content,
+                                                    coalesce=coalesce, chunk_size=chunk_size,
+                                                    engine=engine)) as events:
+                for event in events:
+                    yield event
+        return
+    inf = _decompressed_input(inf)
+    if sys.version_info[0] == 2 and isinstance(inf, unicode):
+        inf = inf.encode(encoding)
+    events = []
+    # As for xml_to_events(), the encoding only applies to binary data
+    binary = isinstance(inf, bytes) or isinstance(inf, _buffer_types)
+    parser = _xml_events_parser(events, engine=engine,
+                                encoding=encoding if binary else None,
+                                process_content=process_content,
+                                coalesce=coalesce)
+    empty = True
+    with contextlib.closing(_iter_xml_chunks(inf, chunk_size=chunk_size)) as chunks:
+        for chunk in chunks:
+            parser.feed(chunk)
+            empty = False
+            for event in events: yield event
+            del events[:]
+    if empty: parser.feed(b"")
+    parser.close()
+    for event in events: yield event
+
+
+class EventBuffer():
+    """
+    Events receiver storing the XML events tuples in a compact form.
+
+    The events kinds are stored in an array of bytes and the events values
+    as indexes in an array referencing a strings table where the element
+    names, attribute names and whitespace only contents are interned, hence
+    the memory used is a fraction of the one of the events tuples list.
+
+    An EventBuffer can be passed as the handler of xml_to_events() or
+    events_from_obj(), and iterated over, for instance by xml_from_events()
+    or events_filter_pretty(), which gets back the events tuples.
+
+    :param events: optional events tuples list or iterator to append
+
+    :Example:
+
+    >>> import xmlplain, sys
+    >>> events = xmlplain.xml_to_events('<doc kind="example">text</doc>', xmlplain.EventBuffer())
+    >>> len(events)
+    6
+    >>> list(events) == xmlplain.xml_to_events('<doc kind="example">text</doc>')
+    True
+    >>> xmlplain.xml_from_events(events, sys.stdout)
+    <?xml version="1.0" encoding="UTF-8"?>
+    <doc kind="example">text</doc>
+
+    .. note: the values of the document start/end events are not stored
+    .. seealso: xml_to_events()
+    """
+    event_kinds = "[]<>@|#"
+    kind_codes = dict([(kind, code) for code, kind in enumerate(event_kinds)])
+    def __init__(self, events=None):
+        self.kinds = array.array('b')
+        self.refs = array.array('l')
+        self.strings = []
+        self.symbols = {}
+        if events != None: self.extend(events)
+    def __len__(self):
+        return len(self.kinds)
+    def __iter__(self):
+        event_kinds, strings, refs = self.event_kinds, self.strings, self.refs
+        pos = 0
+        for code in self.kinds:
+            if code < 2:
+                yield (event_kinds[code], ("",))
+            elif code == 4:
+                yield ('@', (strings[refs[pos]], strings[refs[pos + 1]]))
+                pos += 2
+            else:
+                yield (event_kinds[code], (strings[refs[pos]],))
+                pos += 1
+    def intern(self, string):
+        index = self.symbols.get(string)
+        if index == None:
+            index = self.symbols[string] = len(self.strings)
+            self.strings.append(string)
+        return index
+    def append(self, evt):
+        kind, value = evt
+        code = self.kind_codes.get(kind)
+        if code == None:
+            raise ValueError("invalid event kind: %s" % kind)
+        if code == 5:
+            if value[0].isspace():
+                self.refs.append(self.intern(value[0]))
+            else:
+                self.refs.append(len(self.strings))
+                self.strings.append(value[0])
+        elif code == 4:
+            self.refs.append(self.intern(value[0]))
+            self.refs.append(len(self.strings))
+            self.strings.append(value[1])
+        elif code >= 2:
+            self.refs.append(self.intern(value[0]))
+        self.kinds.append(code)
+    def extend(self, events):
+        for evt in events: self.append(evt)
+
+
+# Header of the binary events format, the last byte being the version
+_evt_magic = b"XEVT\x01"
+
+# Number of events per block of the binary events format
+_evt_block_size = 16384
+
+
+def _evt_varint(value):
+    """
+    Returns the unsigned LEB128 varint bytes for value.
+    """
+    data = bytearray()
+    while value >= 0x80:
+        data.append((value & 0x7f) | 0x80)
+        value >>= 7
+    data.append(value)
+    return bytes(data)
+
+
+def _evt_read(inf, size):
+    """
+    Returns size bytes read from inf, an empty bytestring at the end of
+    the input or raises ValueError for a truncated input.
+    """
+    data = inf.read(size)
+    while 0 < len(data) < size:
+        chunk = inf.read(size - len(data))
+        if not chunk: break
+        data += chunk
+    if 0 < len(data) < size:
+        raise ValueError("truncated binary events format input")
+    return data
+
+
+def _evt_read_varint(inf, first=False):
+    """
+    Returns the varint read from inf, or None at the end of the input
+    when reading the first varint of a block.
+    """
+    value, shift = 0, 0
+    while True:
+        byte = bytearray(inf.read(1))
+        if len(byte) == 0:
+            if first and shift == 0: return None
+            raise ValueError("truncated binary events format input")
+        value |= (byte[0] & 0x7f) << shift
+        if byte[0] < 0x80: return value
+        shift += 7
+
+
+class _EvtWriter():
+    """
+    Events receiver writing the binary events format to outf.
+
+    The events are written by blocks of block_size events, each block
+    consisting of a header of varints: the number of events, of new
+    symbols, of symbol references, the size in bytes of the references
+    and of the strings, followed by:
+
+    - the events kinds codes from EventBuffer.event_kinds, one byte per
+      event, text contents which are whitespace only having the additional
+      kind code 7
+    - the references of the element names, attribute names and whitespace
+      contents, in the order of the events, as little endian unsigned
+      integers of the given size, indexing the table of the symbols
+      of the previous blocks and of the block new symbols
+    - the UTF-8 encoded strings, each terminated by a NUL character:
+      the block new symbols, then the attributes values and text contents
+      in the order of the events
+
+    Hence a block is decoded with a few bulk operations, only the events
+    tuples being built one by one.
+    """
+    def __init__(self, outf, block_size=_evt_block_size):
+        self.outf = outf
+        self.block_size = block_size
+        self.symbols = {}
+        self.outf.write(_evt_magic)
+        self.reset()
+    def reset(self):
+        self.kinds = bytearray()
+        self.refs = []
+        self.new_symbols = []
+        self.strings = []
+    def symbol(self, string):
+        index = self.symbols.get(string)
+        if index == None:
+            index = self.symbols[string] = len(self.symbols)
+            self.new_symbols.append(string)
+        self.refs.append(index)
+    def append(self, evt):
+        kind, value = evt
+        code = EventBuffer.kind_codes.get(kind)
+        if code == None:
+            raise ValueError("invalid event kind: %s" % kind)
+        if code == 5:
+            if value[0].isspace():
+                code = 7
+                self.symbol(value[0])
+            else:
+                self.strings.append(value[0])
+        elif code == 4:
+            self.symbol(value[0])
+            self.strings.append(value[1])
+        elif code >= 2:
+            self.symbol(value[0])
+        self.kinds.append(code)
+        if len(self.kinds) >= self.block_size:
+            self.flush()
+    def flush(self):
+        if len(self.kinds) == 0: return
+        strings = self.new_symbols + self.strings
+        blob = "\0".join(strings) + "\0"
+        if blob.count("\0") != len(strings):
+            raise ValueError("NUL characters are not supported in the binary events format")
+        blob = blob.encode("utf-8")
+        typecode = 'B' if len(self.symbols) <= 0x100 else 'H' if len(self.symbols) <= 0x10000 else 'I'
+        refs = array.array(typecode, self.refs)
+        if sys.byteorder == "big": refs.byteswap()
+        refs = refs.tostring() if sys.version_info[0] == 2 else refs.tobytes()
+        self.outf.write(b"".join([_evt_varint(len(self.kinds)), _evt_varint(len(self.new_symbols)),
+                                  _evt_varint(len(self.refs)), _evt_varint(len(refs)),
+                                  _evt_varint(len(blob)), bytes(self.kinds), refs, blob]))
+        self.reset()
+
+
+def evt_from_events(events, outf=None):
+    """
+    Outputs the binary events format from the events tuples.
+
+    The binary events format is a compact serialization of the events
+    tuples as specified in xml_to_events(), where element and attribute
+    names and whitespace contents are written once and then referenced
+    by index. It is read back with evt_to_events(), iter_evt_events()
+    or evt_to_obj() faster than parsing the XML document again.
+
+    Note that the NUL character, which is not allowed in XML documents,
+    is not supported in the events values.
+
+    :param events: events tuples list or iterator
+    :param outf: output binary file stream or None for bytestring output
+    :return: created byte string when outf if None
+
+    :Example:
+
+    >>> import xmlplain
+    >>> data = xmlplain.evt_from_events(xmlplain.xml_to_events('<doc kind="example">text</doc>'))
+    >>> data
+    b'XEVT\\x01\\x06\\x02\\x03\\x03\\x16\\x00\\x02\\x04\\x05\\x03\\x01\\x00\\x01\\x00doc\\x00kind\\x00example\\x00text\\x00'
+    >>> xmlplain.evt_to_events(data) == xmlplain.xml_to_events('<doc kind="example">text</doc>')
+    True
+
+    .. note: the values of the document start/end events are not stored
+    .. seealso: evt_to_events(), iter_evt_events(), evt_to_obj()
+    """
+    getvalue = None
+    if outf == None:
+        outf = io.BytesIO()
+        getvalue = outf.getvalue
+    writer = _EvtWriter(outf)
+    for evt in events: writer.append(evt)
+    writer.flush()
+    if getvalue:
+        return getvalue()
+
+
+def iter_evt_events(inf):
+    """
+    Generates the events tuples from the binary events format input.
+
+    The input is read and decoded by blocks of events, the memory used
+    being bounded by the block size instead of the input size.
+
+    :param inf: input binary file stream or bytestring or binary buffer
+      (bytearray, memoryview, mmap) or file path object (pathlib.Path),
+      binary input may be gzip, bz2 or xz compressed
+
+    :return: an iterator over the events tuples
+
+    :Example:
+
+    >>> import xmlplain
+    >>> data = xmlplain.evt_from_events(xmlplain.xml_to_events('<doc>text</doc>'))
+    >>> for event in xmlplain.iter_evt_events(data):
+    ...     print(event)
+    ('[', ('',))
+    ('<', ('doc',))
+    ('|', ('text',))
+    ('>', ('doc',))
+    (']', ('',))
+
+    .. seealso: evt_from_events(), evt_to_events()
+    """
+    if _is_path(inf):
+        with _mapped_input(inf) as data:
+            for event in iter_evt_events(data):
+                yield event
+        return
+    inf = _decompressed_input(inf)
+    if isinstance(inf, bytes) or isinstance(inf, (bytearray, memoryview)):
+        inf = io.BytesIO(inf)
+    magic = _evt_read(inf, len(_evt_magic))
+    if magic != _evt_magic:
+        if magic[:-1] == _evt_magic[:-1]:
+            raise ValueError("unsupported binary events format version")
+        raise ValueError("invalid binary events format input")
+    start, end = ('[', ("",)), (']', ("",))
+    symbols = []
+    while True:
+        count = _evt_read_varint(inf, first=True)
+        if count == None: break
+        new_count, refs_count, refs_size, blob_size = [_evt_read_varint(inf) for i in range(4)]
+        kinds = bytearray(_evt_read(inf, count))
+        refs = array.array({refs_count: 'B', 2 * refs_count: 'H'}.get(refs_size, 'I'))
+        data = _evt_read(inf, refs_size)
+        if sys.version_info[0] == 2: refs.fromstring(data)
+        else: refs.frombytes(data)
+        if sys.byteorder == "big": refs.byteswap()
+        strings = _evt_read(inf, blob_size).decode("utf-8").split("\0")
+        if (len(kinds) != count or len(refs) != refs_count or
+            len(strings) <= new_count or strings.pop() != ""):
+            raise ValueError("truncated binary events format input")
+        symbols.extend(strings[:new_count])
+        refs, strings = iter(refs), iter(strings[new_count:])
+        try:
+            for code in kinds:
+                if code == 5:
+                    yield ('|', (next(strings),))
+                elif code == 2:
+                    yield ('<', (symbols[next(refs)],))
+                elif code == 3:
+                    yield ('>', (symbols[next(refs)],))
+                elif code == 4:
+                    yield ('@', (symbols[next(refs)], next(strings)))
+                elif code == 7:
+                    yield ('|', (symbols[next(refs)],))
+                elif code == 6:
+                    yield ('#', (symbols[next(refs)],))
+                elif code == 0:
+                    yield start
+                elif code == 1:
+                    yield end
+                else:
+                    raise ValueError("invalid binary events format kind code: %d" % code)
+        except (StopIteration, IndexError):
+            raise ValueError("invalid binary events format block")
+
+
+def evt_to_events(inf, handler=None):
+    """
+    Generates the events tuples from the binary events format input.
+
+    :param inf: input binary file stream or bytestring or binary buffer
+      (bytearray, memoryview, mmap) or file path object (pathlib.Path),
+      binary input may be gzip, bz2 or xz compressed
+    :param handler: events receiver implementing the append() method or None,
+      in which case a new list will be generated
+
+    :return: returns the handler or the generated list
+
+    .. seealso: evt_from_events(), iter_evt_events(), xml_to_events()
+    """
+    if handler == None: handler = []
+    append = handler.append
+    for event in iter_evt_events(inf): append(event)
+    return handler
+
+
+def evt_to_obj(inf, strip_space=False, fold_dict=False):
+    """
+    Generate an plain object representation from the binary events format input.
+
+    The generated plain object is the same as the one of xml_to_obj()
+    for the XML document the events were generated from.
+
+    :param inf: input binary file stream or bytestring or binary buffer
+      (bytearray, memoryview, mmap) or file path object (pathlib.Path),
+      binary input may be gzip, bz2 or xz compressed
+    :param strip_space: strip spaces from non-leaf text content
+    :param fold_dict: optimized unambiguous lists of dict into ordered dicts
+
+    :return: the root of the generated plain object, actually a single key dict
+
+    :Example:
+
+    >>> import xmlplain
+    >>> data = xmlplain.evt_from_events(xmlplain.xml_to_events(open("tests/example-1.xml")))
+    >>> root = xmlplain.evt_to_obj(data, strip_space=True, fold_dict=True)
+    >>> root == xmlplain.xml_to_obj(open("tests/example-1.xml"), strip_space=True, fold_dict=True)
+    True
+
+    .. seealso: evt_from_events(), xml_to_obj()
+    """
+    return evt_to_events(inf, _ObjGenerator(strip_space=strip_space, fold_dict=fold_dict)).get_value()
+
+
+class _FastXMLGenerator():
+    """
+    Events receiver writing the XML document for the "fast" writer of
+    xml_from_events().
+
+    The output is the same as the one of XMLGenerator() through the
+    QuotingWriter() of the "sax" writer, though escaped by this class
+    and written to outf in chunks of at least buffer_size characters.
+    """
+    def __init__(self, outf, encoding, process_content=None, buffer_size=65536):
+        self.outf = outf
+        self.encoding = encoding
+        self.process_content = process_content
+        self.buffer_size = buffer_size
+        self.encoder = codecs.getincrementalencoder(encoding)(errors="xmlcharrefreplace")
+        self.buffer = []
+        self.size = 0
+        self.start = None
+        self.binary = True
+        try:
+            self.outf.write(b'')
+        except TypeError as e:
+            self.binary = False
+    def write(self, content):
+        self.buffer.append(content)
+        self.size += len(content)
+        if self.size >= self.buffer_size:
+            self.flush()
+    def flush(self, final=False):
+        content = self.encoder.encode("".join(self.buffer), final)
+        self.buffer = []
+        self.size = 0
+        if not self.binary:
+            content = content.decode(self.encoding)
+        if content:
+            self.outf.write(content)
+    def quote_text(self, content):
+        return content.replace("&", "&amp;").replace(">", "&gt;").replace(
+            "<", "&lt;").replace("\r", "&#xd;")
+    def quote_attr(self, content):
+        content = content.replace("&", "&amp;").replace(">", "&gt;").replace(
+            "<", "&lt;").replace("\n", "&#10;").replace("\r", "&#13;").replace(
+                "\t", "&#9;")
+        if '"' not in content:
+            return '"%s"' % content
+        if "'" not in content:
+            return "'%s'" % content
+        return '"%s"' % content.replace('"', "&quot;")
+    def write_start(self):
+        name, attrs = self.start
+        self.start = None
+        if not attrs:
+            self.write("<%s>" % name)
+            return
+        self.write("<%s%s>" % (name, "".join(
+            [" %s=%s" % (k, self.quote_attr(v)) for k, v in attrs.items()])))
+    def append(self, evt):
+        kind, value = evt
+        if kind == '[':
+            self.write('<?xml version="1.0" encoding="%s"?>\n' % self.encoding)
+            self.start = None
+            return
+        if kind == '@':
+            self.start[1][value[0]] = value[1]
+            return
+        if self.start != None:
+            self.write_start()
+        if kind == ']':
+            self.flush(True)
+        elif kind == '<':
+            self.start = (value[0], OrderedDict())
+        elif kind == '>':
+            self.write("</%s>" % value[0])
+        elif kind == '|':
+            content = value[0]
+            if self.process_content != None:
+                content = self.process_content(content)
+            if content:
+                if not isinstance(content, type(u"")):
+                    content = content.decode(self.encoding)
+                self.write(self.quote_text(content))
+        elif kind == '#':
+            if value[0]:
+                self.write(value[0].replace("\r", "&#xd;"))
+
+
+def xml_from_events(events, outf=None, encoding='UTF-8', process_content=None, writer="sax", stats=None):
     """
     Outputs the XML document from the events tuples.
 
     From the given events tuples lists as specified in xml_to_events(),
     generated a well formed XML document.
-    The XML output is generated through xml.saxutils.XMLGenerator().
+    With the default "sax" writer, the XML output is generated through
+    xml.saxutils.XMLGenerator(). The "fast" writer escapes and encodes
+    the output by itself in large chunks, the generated document is
+    the same byte for byte.
 
     :param events: events tuples list or iterator
     :param outf: output file stream or None for bytestring output
@@ -212,11 +1449,23 @@ def xml_from_events(events, outf=None, encoding='UTF-8', process_content=None):
     :param process_content: a function to apply to the cdata content (str for
         python3 or unicode for python2) before being processed by the XML
         writer
+    :param writer: the XML writer, one of: sax, fast (default: sax)
+    :param stats: optional Stats object recording the conversion statistics
     :return: created byte string when outf if None
 
+    :Example:
+
+    >>> import xmlplain
+    >>> events = [('[', ('',)), ('<', ('a',)), ('@', ('b', '"1"')),
+    ...           ('|', ('x < y\\r',)), ('>', ('a',)), (']', ('',))]
+    >>> xmlplain.xml_from_events(events, writer="fast") == xmlplain.xml_from_events(events)
+    True
+
     .. note: unknown events types are ignored
     .. seealso: xml_to_events(), xml.sax.saxutils.XMLGenerator()
     """
+    if writer not in ["sax", "fast"]:
+        raise ValueError("invalid XML writer: %s" % writer)
     class SaxGenerator():
         def __init__(self, sax_receiver, process_content=None):
             self.sax_receiver = sax_receiver
@@ -269,15 +1518,664 @@ def xml_from_events(events, outf=None, encoding='UTF-8', process_content=None):
     if outf == None:
         outf = io.BytesIO()
         getvalue = outf.getvalue
-    writer = QuotingWriter(outf, encoding=encoding)
-    generator = xml.sax.saxutils.XMLGenerator(writer, encoding=encoding)
-    generator = SaxGenerator(generator, process_content=process_content)
-    for evt in events: generator.append(evt)
+    if stats != None:
+        outf = _StatsStream(outf, stats)
+    with _stats_measure(stats, "write"):
+        if writer == "fast":
+            generator = _FastXMLGenerator(outf, encoding=encoding, process_content=process_content)
+            append = generator.append
+            if stats != None:
+                append = _StatsHandler(stats, generator, "write", stats.events_out).append
+            for evt in events: append(evt)
+            generator.flush()
+        else:
+            from xml.sax.saxutils import XMLGenerator
+            writer = QuotingWriter(outf, encoding=encoding)
+            generator = XMLGenerator(writer, encoding=encoding)
+            generator = SaxGenerator(generator, process_content=process_content)
+            if stats != None:
+                generator = _StatsHandler(stats, generator, "write", stats.events_out)
+            for evt in events: generator.append(evt)
     if getvalue:
         return getvalue()
 
 
-def xml_to_obj(inf, encoding="UTF-8", strip_space=False, fold_dict=False, process_content=None):
+class _ObjGenerator():
+    """
+    Events receiver building the plain object as described in xml_to_obj().
+    """
+    def __init__(self, strip_space=False, fold_dict=False, process_root=True):
+        self.value = None
+        self.strip_space = strip_space
+        self.fold_dict = fold_dict
+        self.process_root = process_root
+        self.text = []
+        # Element names and attribute keys are shared for all the elements
+        self.names = {}
+        self.attr_keys = {}
+    def get_value(self):
+        return self.value
+    def strip_space_elts(self, elts):
+        # Only strip space when not a leaf
+        if len(elts) <= 1: return elts
+        elts = [e for e in
+                [s.strip() if not isinstance(s, (dict, LazyPlainObj)) else s for s in elts]
+                if e != ""]
+        return elts
+    def fold_dict_elts(self, elts):
+        if len(elts) <= 1: return elts
+        # Simplify into an OrderedDict if there is no mixed text and no key duplicates
+        keys = set()
+        for elt in elts:
+            if not isinstance(elt, (dict, LazyPlainObj)): return elts
+            keys.update(elt)
+        if len(keys) != len(elts): return elts
+        return OrderedDict([next(iter(elt.items())) for elt in elts])
+    def fold_trivial(self, elts):
+        if isinstance(elts, list):
+            if len(elts) == 0: return ""
+            if len(elts) == 1: return elts[0]
+        return elts
+    def process_children(self, children):
+        if self.strip_space: children = self.strip_space_elts(children)
+        if self.fold_dict: children = self.fold_dict_elts(children)
+        return self.fold_trivial(children)
+    def push_elt(self, name):
+        # The stack holds (elt, name, parent_children) for each open
+        # element, the current element children list being kept apart
+        name = self.names.setdefault(name, name)
+        children = []
+        elt = {name: children}
+        self.children.append(elt)
+        self.stack.append((elt, name, self.children))
+        self.children = children
+    def pop_elt(self, name):
+        elt, elt_name, parent = self.stack.pop()
+        if len(self.stack) > 0 or self.process_root:
+            elt[elt_name] = self.process_children(self.children)
+        self.children = parent
+    def append_attr(self, name, value):
+        key = self.attr_keys.get(name)
+        if key == None:
+            key = self.attr_keys[name] = '@%s' % name
+        self.children.append({key: value})
+    def append_content(self, content):
+        # Contents are accumulated and joined on the next non content event
+        self.text.append(content)
+    def flush_content(self):
+        self.children.append("".join(self.text))
+        del self.text[:]
+    def append(self, event):
+        kind, value = event
+        if kind == '|':
+            self.append_content(value[0])
+            return
+        if len(self.text) > 0 and kind in ['[', ']', '<', '>', '@']:
+            self.flush_content()
+        if kind == '[':
+            self.stack = []
+            self.children = []
+        elif kind == ']':
+            self.value = self.children[0]
+        elif kind == '<':
+            self.push_elt(value[0])
+        elif kind == '>':
+            self.pop_elt(value[0])
+        elif kind == '@':
+            self.append_attr(value[0], value[1])
+
+
+class _LazyObjGenerator(_ObjGenerator):
+    """
+    _ObjGenerator processing the children of a LazyPlainObj element, where
+    the folded dicts are views keeping the children elements views, such
+    that the grandchildren are not generated by the folding.
+    """
+    def fold_dict_elts(self, elts):
+        if len(elts) <= 1: return elts
+        items, index = OrderedDict(), None
+        for elt in elts:
+            if not isinstance(elt, (dict, LazyPlainObj)): return elts
+            # The key of an element view is its name from the index
+            key = next(iter(elt))
+            if isinstance(elt, LazyPlainObj):
+                items[key], index = elt, elt.index
+            else:
+                items[key] = elt[key]
+        if len(items) != len(elts): return elts
+        if index == None: return items
+        return LazyPlainObj(index=index, folded=items)
+
+
+class _LazyIndex(EventBuffer):
+    """
+    EventBuffer storing in addition the events and references offsets of
+    each element, numbered in document order, from which the elements
+    children are generated by LazyPlainObj.
+    """
+    def __init__(self, strip_space=False, fold_dict=False):
+        EventBuffer.__init__(self)
+        self.generator = _LazyObjGenerator(strip_space=strip_space, fold_dict=fold_dict)
+        # Offsets of the start and end events in events.kinds and events.refs
+        # and number of elements in the subtree, for each element
+        self.starts = array.array('l')
+        self.starts_refs = array.array('l')
+        self.ends = array.array('l')
+        self.ends_refs = array.array('l')
+        self.sizes = array.array('l')
+        self.stack = []
+        # Children entries of the elements already walked
+        self.walked = {}
+    def append(self, event):
+        kind = event[0]
+        if kind == '<':
+            self.stack.append(len(self.starts))
+            self.starts.append(len(self.kinds))
+            self.starts_refs.append(len(self.refs))
+            self.ends.append(0)
+            self.ends_refs.append(0)
+            self.sizes.append(0)
+        elif kind == '>':
+            elt = self.stack.pop()
+            self.ends[elt] = len(self.kinds)
+            self.ends_refs[elt] = len(self.refs)
+            self.sizes[elt] = len(self.starts) - elt
+        EventBuffer.append(self, event)
+    def name(self, elt):
+        return self.strings[self.refs[self.starts_refs[elt]]]
+    def walk(self, elt):
+        """
+        Returns the children entries of the element, element numbers for
+        the elements, (key, value) for the attributes and strings for the
+        contents, memoized for each element.
+        """
+        entries = self.walked.get(elt)
+        if entries != None: return entries
+        kinds, refs, strings = self.kinds, self.refs, self.strings
+        generator = self.generator
+        pos, ref, child = self.starts[elt] + 1, self.starts_refs[elt] + 1, elt + 1
+        entries, text = [], []
+        while True:
+            code = kinds[pos]
+            if code == 5 or code == 6:
+                # Contents are joined up to the next non content event
+                # and ignorable whitespaces are discarded as by xml_to_obj()
+                if code == 5: text.append(strings[refs[ref]])
+                pos, ref = pos + 1, ref + 1
+                continue
+            if len(text) > 0:
+                entries.append("".join(text))
+                del text[:]
+            if code == 3:
+                break
+            elif code == 4:
+                key = generator.attr_keys.get(strings[refs[ref]])
+                if key == None:
+                    key = generator.attr_keys[strings[refs[ref]]] = '@%s' % strings[refs[ref]]
+                entries.append((key, strings[refs[ref + 1]]))
+                pos, ref = pos + 1, ref + 2
+            else:
+                entries.append(child)
+                pos, ref = self.ends[child] + 1, self.ends_refs[child] + 1
+                child += self.sizes[child]
+        self.walked[elt] = entries
+        return entries
+    def children(self, elt):
+        children = []
+        for entry in self.walk(elt):
+            if isinstance(entry, int):
+                children.append(LazyPlainObj(index=self, elt=entry))
+            elif isinstance(entry, tuple):
+                children.append({entry[0]: entry[1]})
+            else:
+                children.append(entry)
+        return self.generator.process_children(children)
+
+
+class LazyPlainObj(Mapping):
+    """
+    Read-only view of the plain object of an XML document, generated on demand.
+
+    The view is an events receiver which stores the XML events in a compact
+    EventBuffer indexed by elements, and behaves as the single key dict
+    { elt_name: children } generated by xml_to_obj() for the root element.
+    The children of an element are generated only when the element value
+    is accessed, elements in the children being themselves views.
+    Hence reading a few elements of a big document only builds the plain
+    objects along the path to these elements. With fold_dict, the folded
+    dicts are views as well, which are keyed by the children names without
+    generating the children values.
+
+    A view compares equal to the plain object from xml_to_obj() and can be
+    passed to events_from_obj(), xml_from_obj() and obj_to_yaml().
+    Note that the children are generated again on each access, from the
+    children offsets found on the first access, hence changes to them are
+    not kept in the view.
+
+    :param events: optional events tuples list or iterator to append
+    :param strip_space: strip spaces from non-leaf text content
+    :param fold_dict: optimized unambiguous lists of dict into ordered dicts
+
+    :Example:
+
+    >>> import xmlplain, sys
+    >>> root = xmlplain.xml_to_events('<doc><a kind="x">1</a><b>2</b></doc>', xmlplain.LazyPlainObj())
+    >>> root['doc'][1]
+    {'b': '2'}
+    >>> root == xmlplain.xml_to_obj('<doc><a kind="x">1</a><b>2</b></doc>')
+    True
+    >>> xmlplain.obj_to_yaml(root, sys.stdout)
+    doc:
+    - a:
+      - '@kind': x
+      - '1'
+    - b: '2'
+
+    .. seealso: xml_to_obj(), EventBuffer
+    """
+    __slots__ = ('index', 'elt', 'folded')
+    def __init__(self, events=None, strip_space=False, fold_dict=False, index=None, elt=0, folded=None):
+        self.index = index if index != None else _LazyIndex(strip_space=strip_space, fold_dict=fold_dict)
+        self.elt = elt
+        # A folded dict view maps the keys to the elements views or
+        # to the attributes values
+        self.folded = folded
+        if events != None: self.extend(events)
+    def append(self, event):
+        self.index.append(event)
+    def extend(self, events):
+        for event in events: self.index.append(event)
+    def __len__(self):
+        if self.folded != None: return len(self.folded)
+        return 1 if self.elt < len(self.index.starts) else 0
+    def __iter__(self):
+        if self.folded != None:
+            for key in self.folded: yield key
+        elif self.elt < len(self.index.starts):
+            yield self.index.name(self.elt)
+    def __getitem__(self, key):
+        if self.folded != None:
+            value = self.folded[key]
+            return value[key] if isinstance(value, LazyPlainObj) else value
+        if self.elt >= len(self.index.starts) or key != self.index.name(self.elt):
+            raise KeyError(key)
+        return self.index.children(self.elt)
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+# Default size of the input shards parsed in parallel by xml_to_obj()
+# and iter_xml_children()
+_shard_size = 8 * 1024 * 1024
+
+# Markups of an XML document: comments, CDATA sections, document type
+# declaration, other declarations, processing instructions, end tags,
+# and start tags where quoted attribute values may hold a '>'
+_xml_markup_re = re.compile(
+    br'<(?:!--.*?-->|!\[CDATA\[.*?\]\]>|!DOCTYPE[^\[>]*(?:\[.*?\]\s*)?>|![^>]*>|\?.*?\?>'
+    br'|/[^>]*>|[^>"\']*(?:(?:"[^"]*"|\'[^\']*\')[^>"\']*)*>)', re.S)
+_xml_name_re = re.compile(br'<([^\s/>]+)')
+
+# Openings of the comments, CDATA sections and processing instructions
+# where markups are not recognized, and their ends
+_xml_opaque_re = re.compile(br'<!--|<!\[CDATA\[|<\?')
+_xml_opaque_ends = {b'<!--': b'-->', b'<![CDATA[': b']]>', b'<?': b'?>'}
+
+
+def _xml_shards_input(inf, encoding="UTF-8"):
+    """
+    Returns the (data, path, encoding) input for the shards parsing, where
+    data is a bytestring or a binary buffer or a memory map of the path file.
+
+    As for xml_to_events(), the returned encoding with which the shards are
+    parsed is the given one for strings, bytestrings and binary buffers,
+    and None for binary streams and file paths, the shards prolog
+    declaring then the document encoding.
+    """
+    if sys.version_info[0] == 2 and isinstance(inf, unicode):
+        return (inf.encode(encoding), None, encoding)
+    if sys.version_info[0] >= 3 and isinstance(inf, str):
+        return (inf.encode(encoding), None, encoding)
+    if _is_path(inf):
+        with open(_fspath(inf), "rb") as stream:
+            return _xml_shards_input(stream, encoding=encoding)
+    decompressed = _decompressed_input(inf)
+    if isinstance(inf, memoryview) and decompressed is inf:
+        # The shards splitting needs the find() method of the other buffers
+        return (inf.tobytes(), None, encoding)
+    if (isinstance(inf, bytes) or isinstance(inf, _buffer_types)) and decompressed is inf:
+        return (inf, None, encoding)
+    path = getattr(inf, 'name', None)
+    if (decompressed is inf and 'b' in getattr(inf, 'mode', '') and
+        isinstance(path, str) and os.path.isfile(path) and inf.tell() == 0):
+        try:
+            return (mmap.mmap(inf.fileno(), 0, access=mmap.ACCESS_READ), path, None)
+        except (ValueError, EnvironmentError):
+            pass
+    data = decompressed.read()
+    if not isinstance(data, bytes):
+        return (data.encode(encoding), None, encoding)
+    return (data, None, None)
+
+
+def _xml_root_tag(data):
+    """
+    Returns the (start, end, name) of the root start tag or None
+    when the root element is empty or not found.
+    """
+    if data[:2] in [b'\xff\xfe', b'\xfe\xff']:
+        # Markups are only scanned for ASCII compatible encodings
+        return None
+    for match in _xml_markup_re.finditer(data):
+        kind = data[match.start() + 1:match.start() + 2]
+        if kind in [b'!', b'?']: continue
+        if kind == b'/' or data[match.end() - 2:match.end()] == b'/>': break
+        return (match.start(), match.end(), _xml_name_re.match(data, match.start()).group(1))
+    return None
+
+
+def _iter_xml_shard_ranges(data, start, shard_size=_shard_size):
+    """
+    Generates the (start, end) offsets of the shards of the root element
+    content starting at start, end being None for the last shard which
+    extends to the end of the document.
+
+    The shards are split at the start tags with the same name as the
+    first child of the root element, found after each shard_size bytes,
+    outside of comments, CDATA sections and processing instructions.
+    These are not checked to be actual root element children, though
+    a wrong split makes the parsing of the shard fail.
+    """
+    child = None
+    for match in _xml_markup_re.finditer(data, start):
+        kind = data[match.start() + 1:match.start() + 2]
+        if kind in [b'!', b'?']: continue
+        if kind != b'/': child = _xml_name_re.match(data, match.start()).group(0)
+        break
+    # The data before skipped is known to be outside of the opaque parts
+    skipped, pos = start, start + shard_size
+    while child != None:
+        pos = data.find(child, pos)
+        if pos < 0: break
+        match = _xml_opaque_re.search(data, skipped, pos)
+        if match != None:
+            end = _xml_opaque_ends[match.group(0)]
+            skipped = data.find(end, match.end())
+            if skipped < 0: break
+            skipped += len(end)
+            pos = max(pos, skipped)
+            continue
+        if data[pos + len(child):pos + len(child) + 1] not in [b' ', b'\t', b'\r', b'\n', b'/', b'>']:
+            pos += 1
+            continue
+        yield (start, pos)
+        start, skipped, pos = pos, pos, pos + shard_size
+    yield (start, None)
+
+
+def _xml_shard_obj(task):
+    """
+    Parses a shard document, returns the root element as a single key
+    dict with the list of its children plain objects.
+    """
+    head, data, path, start, end, tail, options = task
+    if data == None:
+        with open(path, "rb") as inf:
+            inf.seek(start)
+            data = inf.read(end - start) if end != None else inf.read()
+    generator = _ObjGenerator(strip_space=options["strip_space"],
+                              fold_dict=options["fold_dict"],
+                              process_root=False)
+    return xml_to_events(head + data + tail, generator,
+                         encoding=options["encoding"],
+                         process_content=options["process_content"],
+                         engine=options["engine"]).get_value()
+
+
+def _xml_shard_pickle(task):
+    """
+    Parses a shard document in a worker process, returns the pickled
+    result of _xml_shard_obj() or None when the parsing fails, as the
+    parser exceptions may not be picklable.
+    """
+    import pickle
+    try:
+        obj = _xml_shard_obj(task)
+    except Exception:
+        return None
+    return pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+
+
+def _xml_shard_unpickle(data):
+    """
+    Returns the unpickled result of _xml_shard_pickle(), the garbage
+    collector, triggered by the many created containers, being disabled.
+    """
+    import pickle, gc
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return pickle.loads(data)
+    finally:
+        if enabled: gc.enable()
+
+
+def _iter_xml_shards_objs(inf, jobs=0, shard_size=_shard_size, **options):
+    """
+    Generates the root element as a single key dict with the list of its
+    children plain objects for each shard of the input, the shards
+    being parsed in order by jobs processes.
+
+    When a shard parsing fails, the rest of the document is parsed in
+    the current process, either the split was wrong and the parsing
+    succeeds or the document is actually malformed.
+    """
+    data, path, encoding = _xml_shards_input(inf, encoding=options["encoding"])
+    options = dict(options, encoding=encoding)
+    root = _xml_root_tag(data)
+    if root == None:
+        yield _xml_shard_obj((data[:], b"", None, 0, 0, b"", options))
+        return
+    tag_start, content_start, name = root
+    first_head, root_head = data[:content_start], data[:tag_start] + b'<' + name + b'>'
+    def shard_task(start, end):
+        # Shards are parsed as the prolog, a root start tag, the shard and
+        # a root end tag, the original root start tag being kept for the
+        # first shard in order to get the root attributes
+        head = first_head if start == content_start else root_head
+        tail = b'</' + name + b'>' if end != None else b""
+        if path == None:
+            return (head, data[start:end], None, start, end, tail, options)
+        return (head, None, path, start, end, tail, options)
+    if jobs <= 0:
+        import multiprocessing
+        jobs = multiprocessing.cpu_count()
+    if jobs > 1:
+        try:
+            from concurrent.futures import ProcessPoolExecutor
+        except ImportError: # pragma: no cover
+            jobs = 1 # Python 2 has no concurrent.futures, shards are parsed serially
+    shards = _iter_xml_shard_ranges(data, content_start, shard_size)
+    if jobs == 1:
+        for start, end in shards:
+            try:
+                obj = _xml_shard_obj(shard_task(start, end))
+            except Exception:
+                if end == None: raise
+                obj = _xml_shard_obj(shard_task(start, None))
+                yield obj
+                return
+            yield obj
+        return
+    import collections
+    executor = ProcessPoolExecutor(max_workers=jobs)
+    pending = collections.deque()
+    try:
+        # Bound the shards in flight such that the input is not loaded at once
+        shards = iter(shards)
+        while True:
+            for start, end in shards:
+                pending.append((start, end, executor.submit(_xml_shard_pickle, shard_task(start, end))))
+                if len(pending) >= 2 * jobs: break
+            if len(pending) == 0: break
+            start, end, future = pending.popleft()
+            result = future.result()
+            if result == None:
+                # The parsing is done again here for the last shard in
+                # order to raise the actual exception
+                obj = _xml_shard_obj(shard_task(start, None))
+                yield obj
+                return
+            yield _xml_shard_unpickle(result)
+    finally:
+        for start, end, future in pending: future.cancel()
+        executor.shutdown()
+
+
+# Version of the xml_to_obj() cache entries, part of the cache keys
+_cache_version = "1"
+
+# Age in seconds after which the temporary files of the cache entries,
+# left by killed processes, are removed on eviction
+_cache_tmp_age = 3600
+
+
+def _cache_key(data, options):
+    """
+    Returns the cache key, a hex digest of the input data bytes or
+    buffer or file path content and of the options list.
+    """
+    import hashlib
+    digest = hashlib.sha256()
+    digest.update(repr([_cache_version, __version__] + list(options)).encode("utf-8"))
+    digest.update(b"\0")
+    if _is_path(data):
+        with open(_fspath(data), "rb") as inf:
+            for chunk in iter(lambda: inf.read(_buffer_chunk_size), b""):
+                digest.update(chunk)
+    else:
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def _cache_input(inf, encoding="UTF-8"):
+    """
+    Returns the (data, inf) input for the cache, where data is the content
+    or file path to hash and inf the input to parse, which for streams is
+    their content, or a binary stream of it for binary streams in order
+    to keep the document declared encoding.
+    """
+    if _is_path(inf):
+        return (inf, inf)
+    if sys.version_info[0] == 2 and isinstance(inf, unicode):
+        return (inf.encode(encoding), inf)
+    if sys.version_info[0] >= 3 and isinstance(inf, str):
+        return (inf.encode(encoding), inf)
+    if isinstance(inf, bytes) or isinstance(inf, _buffer_types):
+        return (inf, inf)
+    content = _decompressed_input(inf).read()
+    if not isinstance(content, bytes):
+        return (content.encode(encoding), content)
+    return (content, io.BytesIO(content))
+
+
+def _cache_load(path):
+    """
+    Returns the plain object of the cache entry, or None when the
+    entry is missing or unreadable, the entry being then removed.
+    """
+    import pickle, gc
+    try:
+        with open(path, "rb") as inf:
+            data = inf.read()
+    except EnvironmentError:
+        return None
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        root = pickle.loads(data)
+    except Exception:
+        # An entry corrupted for instance by a full disk is discarded
+        _cache_remove(path)
+        return None
+    finally:
+        if enabled: gc.enable()
+    try:
+        # The modification time of the entries is their last use time
+        os.utime(path, None)
+    except EnvironmentError:
+        pass
+    return root
+
+
+def _cache_remove(path):
+    """
+    Removes the cache file, which may have been concurrently removed.
+    """
+    try:
+        os.remove(path)
+    except EnvironmentError:
+        pass
+
+
+def _cache_store(path, root, max_bytes=None):
+    """
+    Stores the plain object into the cache entry and evicts the least
+    recently used entries when the cache size is over max_bytes.
+    """
+    import pickle, tempfile
+    data = pickle.dumps(root, pickle.HIGHEST_PROTOCOL)
+    if max_bytes != None and len(data) > max_bytes: return
+    cache_dir = os.path.dirname(path)
+    try:
+        os.makedirs(cache_dir)
+    except EnvironmentError:
+        # May be concurrently created by another process
+        if not os.path.isdir(cache_dir): raise
+    # The entry is written to a temporary file renamed in place such that
+    # concurrent processes never read a partial entry
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=cache_dir)
+    try:
+        with os.fdopen(fd, "wb") as outf:
+            outf.write(data)
+        getattr(os, "replace", os.rename)(tmp_path, path)
+    except Exception:
+        _cache_remove(tmp_path)
+        raise
+    if max_bytes != None: _cache_evict(cache_dir, max_bytes)
+
+
+def _cache_evict(cache_dir, max_bytes):
+    """
+    Removes the least recently used cache entries until the cache size
+    is at most max_bytes.
+
+    The temporary files older than _cache_tmp_age are removed, the other
+    ones being entries in writing, counted in the cache size.
+    """
+    entries, size, now = [], 0, time.time()
+    for name in os.listdir(cache_dir):
+        tmp = name.startswith(".tmp-")
+        if not tmp and not name.endswith(".pickle"): continue
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except EnvironmentError:
+            continue
+        if tmp and now - stat.st_mtime > _cache_tmp_age:
+            _cache_remove(path)
+            continue
+        if not tmp: entries.append((stat.st_mtime, stat.st_size, path))
+        size += stat.st_size
+    entries.sort()
+    for mtime, entry_size, path in entries:
+        if size <= max_bytes: break
+        _cache_remove(path)
+        size -= entry_size
+
+
+def xml_to_obj(inf, encoding="UTF-8", strip_space=False, fold_dict=False, process_content=None, engine="sax",
+               jobs=1, shard_size=_shard_size, lazy=False, stats=None, cache_dir=None, max_bytes=None):
     """
     Generate an plain object representation from the XML input.
 
@@ -300,119 +2198,468 @@ def xml_to_obj(inf, encoding="UTF-8", strip_space=False, fold_dict=False, proces
     Generally one would use this in conjonction with pretty=true
     when emitting back the object to XML with xml_from_obj().
 
-    :param inf: input stream file or string or bytestring
-    :param encoding: encoding used when the input is bytes string
+    When jobs is not 1, the input is split in shards of about shard_size
+    bytes at the root element children boundaries, the shards are parsed
+    in parallel by a pool of jobs processes and the children are reassembled
+    in document order. The generated plain object is the same, though
+    the process_content function must then be picklable, and the input,
+    read or mapped in memory as a whole, must be in an ASCII
+    compatible encoding.
+
+    When cache_dir is given, the generated plain object is stored in the
+    cache directory, keyed by a hash of the input content and of the
+    strip_space, fold_dict and encoding options, such that converting
+    again an unchanged input only loads the stored object. The least
+    recently used entries are removed when the cache is over max_bytes.
+    The cache is safe for concurrent processes, though as the entries
+    are pickled objects the directory must be writable only by trusted
+    users. The cache is not used with the lazy or process_content options.
+
+    :param inf: input stream file or string or bytestring or binary buffer
+      (bytearray, memoryview, mmap) or file path object (pathlib.Path),
+      binary input may be gzip, bz2 or xz compressed
+    :param encoding: encoding used when the input is bytes string or buffer
     :param strip_space: strip spaces from non-leaf text content
     :param fold_dict: optimized unambiguous lists of dict into ordered dicts
-    :param process_content: a function to apply to the cdata content (str for
-        python3 or unicode for python2) after the XML reader content generation
+    :param process_content: a function to apply to the cdata content (str for
+        python3 or unicode for python2) after the XML reader content generation
+    :param engine: the XML parser engine, one of: sax, expat (default: sax)
+    :param jobs: number of parsing processes, 0 for the number of CPUs
+      (default: 1, parse in the current process)
+    :param shard_size: approximative size of the shards when jobs is not 1
+    :param lazy: when True, returns a LazyPlainObj view which generates
+      the elements children on access, jobs being ignored
+    :param stats: optional Stats object recording the conversion statistics,
+      the events of the shards parsed by other processes are not recorded
+    :param cache_dir: optional directory of the parse cache
+    :param max_bytes: maximum size in bytes of the parse cache entries,
+      or None for an unbounded cache
+
+    :return: the root of the generated plain object, actually a single key dict
+
+    :Example:
+
+    >>> import xmlplain, yaml, sys
+    >>> root = xmlplain.xml_to_obj(open("tests/example-1.xml"), strip_space=True)
+    >>> yaml.safe_dump(root, sys.stdout, default_flow_style=False, allow_unicode=True)
+    example:
+    - doc: 'This is an example for xmlobj documentation. '
+    - content:
+      - '@version': beta
+      - kind: document
+      - class: example
+      - structured: ''
+      - elements:
+        - item: Elt 1
+        - doc: Elt 2
+        - item: Elt 3
+        - doc: Elt 4
+
+    >>> root = xmlplain.xml_to_obj(open("tests/example-1.xml"), strip_space=True, fold_dict=True)
+    >>> xmlplain.obj_to_yaml(root, sys.stdout)
+    example:
+      doc: 'This is an example for xmlobj documentation. '
+      content:
+        '@version': beta
+        kind: document
+        class: example
+        structured: ''
+        elements:
+        - item: Elt 1
+        - doc: Elt 2
+        - item: Elt 3
+        - doc: Elt 4
+
+    .. seealso: xml_from_obj(), iter_xml_objs(), iter_xml_children(), LazyPlainObj
+    """
+    if cache_dir != None and not lazy and process_content == None:
+        data, inf = _cache_input(inf, encoding=encoding)
+        path = os.path.join(cache_dir, _cache_key(data, [strip_space, fold_dict, encoding]) + ".pickle")
+        with _stats_measure(stats, "cache"):
+            root = _cache_load(path)
+        if root != None: return root
+        root = xml_to_obj(inf, encoding=encoding, strip_space=strip_space, fold_dict=fold_dict,
+                          engine=engine, jobs=jobs, shard_size=shard_size, stats=stats)
+        with _stats_measure(stats, "cache"):
+            _cache_store(path, root, max_bytes=max_bytes)
+        return root
+    if lazy:
+        index = _LazyIndex(strip_space=strip_space, fold_dict=fold_dict)
+        xml_to_events(inf, index if stats == None else
+                      _StatsHandler(stats, index, "build", stats.events_in),
+                      encoding=encoding, process_content=process_content,
+                      engine=engine, stats=stats)
+        return LazyPlainObj(index=index)
+    if jobs != 1:
+        if stats != None:
+            with stats.measure("parse"):
+                return xml_to_obj(_stats_input(inf, stats), encoding=encoding,
+                                  strip_space=strip_space, fold_dict=fold_dict,
+                                  process_content=process_content, engine=engine,
+                                  jobs=jobs, shard_size=shard_size)
+        name, children = None, []
+        for shard in _iter_xml_shards_objs(inf, jobs=jobs, shard_size=shard_size,
+                                           encoding=encoding, strip_space=strip_space,
+                                           fold_dict=fold_dict, process_content=process_content,
+                                           engine=engine):
+            name, shard_children = next(iter(shard.items()))
+            children.extend(shard_children)
+        generator = _ObjGenerator(strip_space=strip_space, fold_dict=fold_dict)
+        return {name: generator.process_children(children)}
+    generator = _ObjGenerator(strip_space=strip_space, fold_dict=fold_dict)
+    xml_to_events(inf, generator if stats == None else
+                  _StatsHandler(stats, generator, "build", stats.events_in),
+                  encoding=encoding, process_content=process_content,
+                  engine=engine, stats=stats)
+    return generator.get_value()
+
+
+def iter_xml_children(inf, encoding="UTF-8", strip_space=False, fold_dict=False, process_content=None, engine="sax",
+                      jobs=0, shard_size=_shard_size):
+    """
+    Generates the plain objects for the root element children, parsed in parallel.
+
+    The input is split in shards of about shard_size bytes at the
+    root element children boundaries, found by a scan of the document
+    markups, the shards are parsed in parallel by a pool of jobs processes
+    and the children elements are yielded in document order, as would be
+    generated by iter_xml_objs() for the "*/*" path.
+    This is suitable for huge documents made of repeated records.
+
+    Note that the process_content function must be picklable, and the input,
+    read or mapped in memory as a whole, must be in an ASCII compatible
+    encoding.
+
+    :param inf: input stream file or string or bytestring or binary buffer
+      (bytearray, memoryview, mmap) or file path object (pathlib.Path),
+      binary input may be gzip, bz2 or xz compressed
+    :param encoding: encoding used when the input is bytes string or buffer
+    :param strip_space: strip spaces from non-leaf text content
+    :param fold_dict: optimized unambiguous lists of dict into ordered dicts
+    :param process_content: a function to apply to the cdata content (str for
+        python3 or unicode for python2) after the XML reader content generation
+    :param engine: the XML parser engine, one of: sax, expat (default: sax)
+    :param jobs: number of parsing processes, 0 for the number of CPUs
+      (default: 0)
+    :param shard_size: approximative size of the shards
+
+    :return: an iterator over the plain objects, each a single key dict
+
+    :Example:
+
+    >>> import xmlplain, sys
+    >>> for item in xmlplain.iter_xml_children(open("tests/example-1.xml", "rb"), strip_space=True,
+    ...                                        fold_dict=True, jobs=1, shard_size=16):
+    ...     xmlplain.obj_to_yaml(item, sys.stdout)
+    doc: 'This is an example for xmlobj documentation. '
+    content:
+      '@version': beta
+      kind: document
+      class: example
+      structured: ''
+      elements:
+      - item: Elt 1
+      - doc: Elt 2
+      - item: Elt 3
+      - doc: Elt 4
+    >>> root = xmlplain.xml_to_obj(open("tests/example-1.xml", "rb"), jobs=2, shard_size=16)
+    >>> root == xmlplain.xml_to_obj(open("tests/example-1.xml", "rb"))
+    True
+
+    .. seealso: xml_to_obj(), iter_xml_objs()
+    """
+    for shard in _iter_xml_shards_objs(inf, jobs=jobs, shard_size=shard_size,
+                                       encoding=encoding, strip_space=strip_space,
+                                       fold_dict=fold_dict, process_content=process_content,
+                                       engine=engine):
+        for child in next(iter(shard.values())):
+            if isinstance(child, dict) and not next(iter(child)).startswith("@"):
+                yield child
+
+
+def iter_xml_objs(inf, path, encoding="UTF-8", strip_space=False, fold_dict=False, process_content=None, chunk_size=65536, engine="sax"):
+    """
+    Generates the plain objects for the XML subtrees matching a path.
+
+    The input is parsed incrementally with iter_xml_events() and each
+    element matching the given path is yielded as its own plain object,
+    as would be generated by xml_to_obj() for this element, as soon as
+    the element end is parsed.
+    The rest of the document is discarded, hence the memory used is
+    bounded by the size of a single matching subtree.
+
+    The path is a '/' separated list of element names starting from the
+    root element, where a '*' name matches any element.
+    For instance "root/record" matches the 'record' children of the
+    'root' element and "*/*" matches all the children of the root element.
+
+    :param inf: input stream file or string or bytestring or binary buffer
+      (bytearray, memoryview, mmap) or file path object (pathlib.Path),
+      binary input may be gzip, bz2 or xz compressed
+    :param path: the path of the elements to generate
+    :param encoding: encoding used when the input is bytes string or buffer
+    :param strip_space: strip spaces from non-leaf text content
+    :param fold_dict: optimized unambiguous lists of dict into ordered dicts
+    :param process_content: a function to apply to the cdata content (str for
+        python3 or unicode for python2) after the XML reader content generation
+    :param chunk_size: size of the chunks read from the input and fed to
+      the parser
+    :param engine: the XML parser engine, one of: sax, expat (default: sax)
+
+    :return: an iterator over the plain objects, each a single key dict
+
+    :Example:
+
+    >>> import xmlplain, sys
+    >>> for item in xmlplain.iter_xml_objs(open("tests/example-1.xml"), "example/content/elements/*"):
+    ...     xmlplain.obj_to_yaml(item, sys.stdout)
+    item: Elt 1
+    doc: Elt 2
+    item: Elt 3
+    doc: Elt 4
+
+    .. seealso: xml_to_obj(), iter_xml_events()
+    """
+    path = path.split("/")
+    names = []
+    generator = None
+    for event in iter_xml_events(inf, encoding=encoding,
+                                 process_content=process_content,
+                                 chunk_size=chunk_size, engine=engine):
+        kind, value = event
+        if kind == '<':
+            names.append(value[0])
+            if (generator == None and len(names) == len(path) and
+                all([p == "*" or p == n for p, n in zip(path, names)])):
+                generator = _ObjGenerator(strip_space=strip_space,
+                                          fold_dict=fold_dict)
+                generator.append(('[', ("",)))
+        if generator != None:
+            generator.append(event)
+        if kind == '>':
+            if generator != None and len(names) == len(path):
+                generator.append((']', ("",)))
+                yield generator.get_value()
+                generator = None
+            names.pop()
+
+
+# Steps and predicates of the select() paths
+_select_step_re = re.compile(r'(@?)([^/\[\]@\s]+)')
+_select_pred_re = re.compile(r'\[\s*(?:(\d+)|@([^=\]\s]+)\s*(?:=\s*(?:"([^"]*)"|\'([^\']*)\'))?)\s*\]')
+
+
+def _select_steps(path):
+    """
+    Returns the (absolute, steps, attr) parsed select() path, where steps is
+    a list of (name, predicates) for the elements steps and attr is the
+    final attribute step name or None.
+
+    The predicates are ("index", n, None) for a position predicate and
+    ("attr", name, value) for an attribute predicate, value being None
+    when only checking the attribute presence.
+    """
+    absolute = path.startswith("/")
+    pos = 1 if absolute else 0
+    steps, attr = [], None
+    while True:
+        match = _select_step_re.match(path, pos)
+        if match == None or attr != None:
+            raise ValueError("invalid select path: %s" % path)
+        name, pos = match.group(2), match.end()
+        if match.group(1):
+            attr = name
+        else:
+            predicates = []
+            match = _select_pred_re.match(path, pos)
+            while match != None:
+                if match.group(1) != None:
+                    if int(match.group(1)) == 0:
+                        raise ValueError("invalid select path: %s" % path)
+                    predicates.append(("index", int(match.group(1)), None))
+                else:
+                    value = match.group(3) if match.group(3) != None else match.group(4)
+                    predicates.append(("attr", match.group(2), value))
+                pos = match.end()
+                match = _select_pred_re.match(path, pos)
+            steps.append((name, predicates))
+        if pos == len(path): break
+        if path[pos] != "/":
+            raise ValueError("invalid select path: %s" % path)
+        pos += 1
+    if len(steps) == 0 and (absolute or attr == None):
+        raise ValueError("invalid select path: %s" % path)
+    return (absolute, steps, attr)
+
+
+def _select_match(step, name, attrs, counts):
+    """
+    Returns True when the element name and attributes list match the
+    step, counts being the positions counters of the step predicates
+    for the parent element.
+    """
+    step_name, predicates = step
+    if step_name != "*" and step_name != name: return False
+    for idx, predicate in enumerate(predicates):
+        kind, key, value = predicate
+        if kind == "index":
+            counts[idx] += 1
+            if counts[idx] != key: return False
+        elif not any([attr_name == key and (value == None or attr_value == value)
+                      for attr_name, attr_value in attrs]):
+            return False
+    return True
+
+
+def _select_obj_children(value):
+    """
+    Generates the (name, parent) pairs of the attributes and elements
+    children of a plain object element value, either a list or a folded
+    dict, where parent is the dict holding the child value for the name.
+    """
+    if isinstance(value, list):
+        for child in value:
+            if isinstance(child, (dict, LazyPlainObj)):
+                for name in child: yield (name, child)
+    elif isinstance(value, (dict, LazyPlainObj)):
+        for name in value: yield (name, value)
+
+
+def _select_obj(root, steps, attr):
+    """
+    Generates the matches of the parsed path steps in the plain object.
+    """
+    # The elements matching the steps so far are (name, parent) pairs,
+    # the children values being only generated for these elements
+    elts = [(None, {None: [root]})]
+    for step in steps:
+        matches = []
+        with_attrs = any([predicate[0] == "attr" for predicate in step[1]])
+        for elt_name, elt_parent in elts:
+            counts = [0] * len(step[1])
+            for name, parent in _select_obj_children(elt_parent[elt_name]):
+                if name.startswith("@"): continue
+                attrs = []
+                if with_attrs:
+                    attrs = [(key[1:], attrs_parent[key]) for key, attrs_parent in
+                             _select_obj_children(parent[name]) if key.startswith("@")]
+                if _select_match(step, name, attrs, counts):
+                    matches.append((name, parent))
+        elts = matches
+    for name, parent in elts:
+        if attr != None:
+            for key, attrs_parent in _select_obj_children(parent[name]):
+                if key == "@" + attr: yield attrs_parent[key]
+        elif len(parent) == 1:
+            yield parent
+        else:
+            yield {name: parent[name]}
+
+
+def _select_events(events, steps, attr, strip_space=False, fold_dict=False):
+    """
+    Generates the matches of the parsed path steps in the events stream.
+    """
+    # The stack holds for each open element, the document being the first
+    # entry, the positions counters of the next step predicates when the
+    # element matches the steps so far, or None
+    stack = [[0] * len(steps[0][1])]
+    # The (name, attrs, counts) of the last start element, when its parent
+    # matches, until its attributes are all read
+    pending = None
+    generator, generator_depth = None, None
+    for event in events:
+        kind, value = event
+        if pending != None:
+            if kind == '@':
+                pending[1].append(value)
+                continue
+            name, attrs, counts = pending
+            pending = None
+            depth = len(stack) - 1
+            if _select_match(steps[depth - 1], name, attrs, counts):
+                if depth < len(steps):
+                    stack[-1] = [0] * len(steps[depth][1])
+                elif attr != None:
+                    for attr_name, attr_value in attrs:
+                        if attr_name == attr: yield attr_value
+                else:
+                    generator, generator_depth = _ObjGenerator(strip_space=strip_space,
+                                                               fold_dict=fold_dict), depth
+                    generator.append(('[', ("",)))
+                    generator.append(('<', (name,)))
+                    for attr_value in attrs: generator.append(('@', attr_value))
+        if kind == '<':
+            if generator == None and stack[-1] != None:
+                pending = (value[0], [], stack[-1])
+            stack.append(None)
+        if generator != None:
+            generator.append(event)
+        if kind == '>':
+            if generator != None and len(stack) - 1 == generator_depth:
+                generator.append((']', ("",)))
+                yield generator.get_value()
+                generator = None
+            stack.pop()
+        elif kind == '[':
+            stack = [[0] * len(steps[0][1])]
+
+
+def select(source, path, strip_space=False, fold_dict=False):
+    """
+    Generates the elements or attributes values matching a path in a plain
+    object or in an XML events stream.
+
+    The path is a '/' separated list of steps relative to the root element,
+    or starting from the root element itself when the path starts with '/'.
+    Each step is an element name or '*' for any element, followed by optional
+    predicates: '[n]' for the n-th matching element from 1, '[@attr]' for an
+    element with the given attribute, '[@attr="value"]' for an element with
+    the given attribute value. The last step may be '@attr' in order to get
+    the attribute value of the matching elements.
+    For instance on tests/example-1.xml, "content/elements/item" and
+    "/example/content/elements/item" both match the two 'item' elements,
+    "content/elements/*[2]" matches the second element and
+    "content[@version='beta']/@version" generates 'beta'.
+
+    The source is either a plain object as generated by xml_to_obj(), or
+    an events stream as generated by xml_to_events() or iter_xml_events(),
+    in which case the matching elements plain objects are generated as for
+    xml_to_obj() with the strip_space and fold_dict options, and the events
+    stream is read only as far as needed, hence a lookup over
+    iter_xml_events() stops parsing the input when the iteration is stopped.
+
+    :param source: the plain object or the XML events stream
+    :param path: the path of the elements to generate
+    :param strip_space: strip spaces from non-leaf text content of the
+      elements generated from an events stream
+    :param fold_dict: optimized unambiguous lists of dict into ordered dicts
+      for the elements generated from an events stream
 
-    :return: the root of the generated plain object, actually a single key dict
+    :return: an iterator over the matching elements plain objects, each a
+      single key dict, or over the attributes values
 
     :Example:
 
-    >>> import xmlplain, yaml, sys
+    >>> import xmlplain
     >>> root = xmlplain.xml_to_obj(open("tests/example-1.xml"), strip_space=True)
-    >>> yaml.safe_dump(root, sys.stdout, default_flow_style=False, allow_unicode=True)
-    example:
-    - doc: 'This is an example for xmlobj documentation. '
-    - content:
-      - '@version': beta
-      - kind: document
-      - class: example
-      - structured: ''
-      - elements:
-        - item: Elt 1
-        - doc: Elt 2
-        - item: Elt 3
-        - doc: Elt 4
-
-    >>> root = xmlplain.xml_to_obj(open("tests/example-1.xml"), strip_space=True, fold_dict=True)
-    >>> xmlplain.obj_to_yaml(root, sys.stdout)
-    example:
-      doc: 'This is an example for xmlobj documentation. '
-      content:
-        '@version': beta
-        kind: document
-        class: example
-        structured: ''
-        elements:
-        - item: Elt 1
-        - doc: Elt 2
-        - item: Elt 3
-        - doc: Elt 4
-
-    .. seealso: xml_from_obj()
+    >>> list(xmlplain.select(root, "content/elements/item"))
+    [{'item': 'Elt 1'}, {'item': 'Elt 3'}]
+    >>> list(xmlplain.select(root, "/example/content[@version='beta']/@version"))
+    ['beta']
+    >>> events = xmlplain.iter_xml_events(open("tests/example-1.xml"))
+    >>> next(xmlplain.select(events, "content/elements/*[2]"))
+    {'doc': 'Elt 2'}
+
+    .. seealso: iter_xml_objs(), xml_to_obj(), iter_xml_events()
     """
-    class ObjGenerator():
-        def __init__(self, strip_space=False, fold_dict=False):
-            self.value = None
-            self.strip_space = strip_space
-            self.fold_dict = fold_dict
-        def get_value(self):
-            return self.value
-        def strip_space_elts(self, elts):
-            # Only strip space when not a leaf
-            if len(elts) <= 1: return elts
-            elts = [e for e in
-                    [s.strip() if not isinstance(s, dict) else s for s in elts]
-                    if e != ""]
-            return elts
-        def fold_dict_elts(self, elts):
-            if len(elts) <= 1: return elts
-            # Simplify into an OrderedDict if there is no mixed text and no key duplicates
-            keys = ['#' if not isinstance(e, dict) else list(e.keys())[0] for e in elts]
-            unique_keys = list(set(keys))
-            if len(unique_keys) == len(keys) and '#' not in unique_keys:
-                return OrderedDict([list(elt.items())[0] for elt in elts])
-            return elts
-        def fold_trivial(self, elts):
-            if isinstance(elts, list):
-                if len(elts) == 0: return ""
-                if len(elts) == 1: return elts[0]
-            return elts
-        def process_children(self):
-            name, children = list(self.stack[-1].items())[0]
-            children = self.children()
-            if self.strip_space: children = self.strip_space_elts(children)
-            if self.fold_dict: children = self.fold_dict_elts(children)
-            children = self.fold_trivial(children)
-            self.stack[-1][name] = children
-        def children(self):
-            return list(self.stack[-1].values())[0]
-        def push_elt(self, name):
-            elt = {name: []}
-            self.children().append(elt)
-            self.stack.append(elt)
-        def pop_elt(self, name):
-            self.stack.pop()
-        def append_attr(self, name, value):
-            self.children().append({'@%s' % name: value})
-        def append_content(self, content):
-            children = self.children()
-            if len(children) > 0 and not isinstance(children[-1], dict):
-                children[-1] += content
-            else:
-                children.append(content)
-        def append(self, event):
-            kind, value = event
-            if kind == '[':
-                self.stack = [{'_': []}]
-            elif kind == ']':
-                self.value = self.children()[0]
-            elif kind == '<':
-                self.push_elt(value[0])
-            elif kind == '>':
-                self.process_children()
-                self.pop_elt(value[0])
-            elif kind == '@':
-                self.append_attr(value[0], value[1])
-            elif kind == '|':
-                self.append_content(value[0])
-    return xml_to_events(inf, ObjGenerator(strip_space=strip_space,
-                                           fold_dict=fold_dict),
-                         encoding=encoding,
-                         process_content=process_content).get_value()
+    absolute, steps, attr = _select_steps(path)
+    # A relative path starts with a step matching the root element
+    if not absolute: steps = [("*", [])] + steps
+    if isinstance(source, (dict, LazyPlainObj)):
+        return _select_obj(source, steps, attr)
+    return _select_events(source, steps, attr, strip_space=strip_space,
+                          fold_dict=fold_dict)
 
 
 def events_filter_pretty(events, handler=None, indent="  "):
@@ -424,59 +2671,69 @@ def events_filter_pretty(events, handler=None, indent="  "):
     pretty print. the generated events stream is still a valid events stream
     suitable for xml_from_events().
 
+    The filter runs in linear time and only buffers the events of the
+    current element start until it is known whether it is a leaf element
+    (output on a single line) or not. When no handler is given, the events
+    are generated lazily as the input events stream is consumed.
+
     :param events: the input XML events stream
     :param handler: events receiver implementing the append() method or None,
-      in which case a new list will be generated
+      in which case an events iterator will be generated
     :param indent: the base indent string, defaults to 2-space indent
 
-    :return: the handler if not None or the newly created events list
+    :return: the handler if not None or an iterator over the filtered events
 
     .. seealso: xml_from_event()
     """
-    class EventFilterPretty():
-        def __init__(self, handler, indent="  "):
-            self.handler = handler
-            self.indent = indent
-        def filter(self, events):
-            events = iter(events)
-            lookahead = []
-            depth = 0
-            while True:
-                if len(lookahead) == 0:
-                    while True:
-                        e = next(events, None)
-                        if e == None: break
-                        lookahead.append(e)
-                        if e[0] in [">", "]"]: break
-                    if len(lookahead) == 0: break
-                kinds = list(next(iter(zip(*lookahead))))
-                if kinds[0] == "<" and not "<" in kinds[1:]:
-                    if depth > 0: self.handler.append(('#', ('\n',)))
-                    self.handler.append(('#', (self.indent * depth,)))
-                    while lookahead[0][0] != ">": self.handler.append(lookahead.pop(0))
-                    self.handler.append(lookahead.pop(0))
-                    if depth == 0: self.handler.append(('#', ('\n',)))
-                else:
-                    if kinds[0] == "<":
-                        if depth > 0: self.handler.append(('#', ('\n',)))
-                        self.handler.append(('#', (self.indent * depth,)))
-                        self.handler.append(lookahead.pop(0))
-                        depth += 1
-                    elif kinds[0] == ">":
-                        depth -= 1
-                        self.handler.append(('#', ('\n',)))
-                        self.handler.append(('#', (self.indent * depth,)))
-                        self.handler.append(lookahead.pop(0))
-                        if depth == 0: self.handler.append(('#', ('\n',)))
-                    elif kinds[0] == "|":
-                        self.handler.append(('#', ('\n',)))
-                        self.handler.append(('#', (self.indent * depth,)))
-                        self.handler.append(lookahead.pop(0))
-                    else:
-                        self.handler.append(lookahead.pop(0))
-            assert(next(events, None) == None) # assert all events are consummed
-    if handler == None: handler = []
-    EventFilterPretty(handler).filter(events)
+    def open_elt(events, depth):
+        # Output a non-leaf element start and its attributes/contents
+        if depth > 0: yield ('#', ('\n',))
+        yield ('#', (indent * depth,))
+        yield events[0]
+        for event in events[1:]:
+            if event[0] == "|":
+                yield ('#', ('\n',))
+                yield ('#', (indent * (depth + 1),))
+            yield event
+    def filter_pretty(events):
+        depth = 0
+        start = None
+        for event in events:
+            kind = event[0]
+            if start != None:
+                if kind not in ["<", ">", "]"]:
+                    start.append(event)
+                    continue
+                if kind == ">":
+                    # Leaf element, output on a single line
+                    if depth > 0: yield ('#', ('\n',))
+                    yield ('#', (indent * depth,))
+                    for e in start: yield e
+                    yield event
+                    if depth == 0: yield ('#', ('\n',))
+                    start = None
+                    continue
+                for e in open_elt(start, depth): yield e
+                depth += 1
+                start = None
+            if kind == "<":
+                start = [event]
+            elif kind == ">":
+                depth -= 1
+                yield ('#', ('\n',))
+                yield ('#', (indent * depth,))
+                yield event
+                if depth == 0: yield ('#', ('\n',))
+            elif kind == "|":
+                yield ('#', ('\n',))
+                yield ('#', (indent * depth,))
+                yield event
+            else:
+                yield event
+        if start != None:
+            for e in open_elt(start, depth): yield e
+    if handler == None: return filter_pretty(events)
+    for event in filter_pretty(events): handler.append(event)
     return handler
 
 
@@ -486,51 +2743,61 @@ def events_from_obj(root, handler=None):
 
     Generates an XML event stream suitable for xml_from_events() from
     a well formed XML plain object and pass it through the append()
-    method to the receiver or to a newly created list.
+    method to the receiver or to a generated events iterator.
+
+    The plain object is walked with an explicit stack, hence there is
+    no limit on the document depth and the events are generated
+    lazily when no handler is given.
 
     :param root: root of the XML plain object
     :param handler: events receiver implementing the append() method or None,
-      in which case a new list will be generated
+      in which case an events iterator will be generated
 
-    :return: the handler if not None or the created events list
+    :return: the handler if not None or an iterator over the created events
 
     .. seealso: xml_from_events()
     """
-    class EventGenerator():
-        def __init__(self, handler):
-            self.handler = handler
-        def gen_content(self, token):
-            self.handler.append(('|', (token,)))
-        def gen_elt(self, name, children):
-            self.handler.append(('<', (name,)))
-            self.gen_attrs_or_elts(children)
-            self.handler.append(('>', (name,)))
-        def gen_attr(self, name, value):
-            self.handler.append(('@', (name, value)))
-        def gen_attr_or_elt(self, name, children):
-            if name[0] == "@":
-                self.gen_attr(name[1:], children)
+    def generate_from(root):
+        assert(isinstance(root, (dict, LazyPlainObj)))
+        assert(len(root.items()) == 1)
+        end = object()
+        # The stack holds (is_dict, items_iterator, elt_name) for each
+        # list or dict being generated, elt_name being None for nested lists
+        stack = []
+        # Next (name, children) to generate, name being None for list items
+        node = list(root.items())[0]
+        yield ('[', ("",))
+        while True:
+            if node != None:
+                name, children = node
+                node = None
+                if name != None and name[0] == "@":
+                    yield ('@', (name[1:], children))
+                else:
+                    if name != None: yield ('<', (name,))
+                    if isinstance(children, list):
+                        stack.append((False, iter(children), name))
+                    elif isinstance(children, (dict, LazyPlainObj)):
+                        stack.append((True, iter(children.items()), name))
+                    else:
+                        yield ('|', (children,))
+                        if name != None: yield ('>', (name,))
+            if len(stack) == 0: break
+            is_dict, items, name = stack[-1]
+            item = next(items, end)
+            if item is end:
+                stack.pop()
+                if name != None: yield ('>', (name,))
             else:
-                self.gen_elt(name, children)
-        def gen_attrs_or_elts(self, elts):
-            if isinstance(elts, list):
-                for elt in elts: self.gen_attrs_or_elts(elt)
-            elif isinstance(elts, dict):
-                for name, children in elts.items(): self.gen_attr_or_elt(name, children)
-            else: self.gen_content(elts)
-        def generate_from(self, root):
-            assert(isinstance(root, dict))
-            assert(len(root.items()) == 1)
-            (name, children) = list(root.items())[0]
-            self.handler.append(('[', ("",)))
-            self.gen_elt(name, children)
-            self.handler.append((']', ("",)))
-    if handler == None: handler = []
-    EventGenerator(handler).generate_from(root)
+                node = item if is_dict else (None, item)
+        yield (']', ("",))
+    if handler == None: return generate_from(root)
+    for event in generate_from(root): handler.append(event)
     return handler
 
 
-def xml_from_obj(root, outf=None, encoding='UTF-8', pretty=True, indent="  ", process_content=None):
+def xml_from_obj(root, outf=None, encoding='UTF-8', pretty=True, indent="  ", process_content=None, writer="sax",
+                 stats=None):
     """
     Generate a XML output from a plain object
 
@@ -546,16 +2813,49 @@ def xml_from_obj(root, outf=None, encoding='UTF-8', pretty=True, indent="  ", pr
     :param process_content: a function to apply to the cdata content (str for
         python3 or unicode for python2) before being processed by the XML
         writer
+    :param writer: the XML writer, one of: sax, fast (default: sax)
+    :param stats: optional Stats object recording the conversion statistics
 
     :return: created byte string when outf if None
 
-    .. seealso xml_to_obj()
+    .. seealso xml_to_obj(), xml_from_events()
     """
     events = events_from_obj(root)
+    if stats != None: events = _iter_stats_stage(stats, "from_obj", events)
     if pretty: events = events_filter_pretty(events, indent=indent)
-    return xml_from_events(events, outf, encoding=encoding, process_content=process_content)
+    if stats != None and pretty: events = _iter_stats_stage(stats, "pretty", events)
+    return xml_from_events(events, outf, encoding=encoding, process_content=process_content, writer=writer,
+                           stats=stats)
+
+def _yaml_classes(backend="auto"):
+    """
+    Returns the tuple (backend, SafeDumper, SafeLoader) for the YAML backend.
+
+    The "auto" backend resolves to "libyaml" when PyYAML was built
+    with the libyaml bindings and to "python" otherwise.
+    """
+    if backend not in ["auto", "libyaml", "python"]:
+        raise ValueError("invalid YAML backend: %s" % backend)
+    import yaml
+    if backend != "python" and hasattr(yaml, "CSafeDumper"):
+        return ("libyaml", yaml.CSafeDumper, yaml.CSafeLoader)
+    if backend == "libyaml":
+        raise ValueError("YAML backend not available: %s" % backend)
+    return ("python", yaml.SafeDumper, yaml.SafeLoader)
+
+
+def yaml_backend(backend="auto"):
+    """
+    Returns the YAML backend used by obj_to_yaml() and obj_from_yaml().
+
+    :param backend: the requested backend, one of: auto, libyaml, python
 
-def obj_to_yaml(root, outf=None, encoding="UTF-8", process_string=None):
+    :return: the actual backend, either "libyaml" or "python"
+    """
+    return _yaml_classes(backend)[0]
+
+
+def obj_to_yaml(root, outf=None, encoding="UTF-8", process_string=None, backend="auto", stats=None):
     """
     Output an XML plain object to yaml.
 
@@ -576,10 +2876,26 @@ def obj_to_yaml(root, outf=None, encoding="UTF-8", process_string=None):
     :param encoding: output bytestring or file stream encoding
     :param process_string: a function to apply to strings (str for
         python3 or unicode for python2) before the YAML writer output
+    :param backend: the YAML backend, one of: auto, libyaml, python, where
+      "auto" selects the faster libyaml emitter when available. Note that
+      the libyaml and python emitters may differ in line folding of long
+      quoted strings, the emitted YAML being equivalent though
+    :param stats: optional Stats object recording the conversion statistics
 
     :return: None or the generated byte string if stream is None
+
+    .. seealso: yaml_backend()
     """
-    class LocalDumper(yaml.SafeDumper):
+    if stats != None:
+        with stats.measure("yaml_dump"):
+            result = obj_to_yaml(root, outf if outf == None else _StatsStream(outf, stats),
+                                 encoding=encoding, process_string=process_string,
+                                 backend=backend)
+        if result != None: stats.bytes_out += len(result)
+        return result
+    import yaml
+    backend, SafeDumper, SafeLoader = _yaml_classes(backend)
+    class LocalDumper(SafeDumper):
         def dict_representer(self, data):
             return self.represent_dict(data.items())
         def represent_scalar(self, tag, value, style=None):
@@ -589,14 +2905,15 @@ def obj_to_yaml(root, outf=None, encoding="UTF-8", process_string=None):
             # force strings with newlines to output as block mode
             if tag == 'tag:yaml.org,2002:str' and style != '|' and value.find('\n') >= 0:
                 style = '|'
-            return yaml.SafeDumper.represent_scalar(self, tag, value, style)
+            return SafeDumper.represent_scalar(self, tag, value, style)
     LocalDumper.add_representer(OrderedDict, LocalDumper.dict_representer)
+    LocalDumper.add_representer(LazyPlainObj, LocalDumper.dict_representer)
 
     return yaml.dump(root, outf, allow_unicode=True, default_flow_style=False,
                      encoding=encoding, Dumper=LocalDumper)
 
 
-def obj_from_yaml(inf, encoding="UTF-8", process_string=None):
+def obj_from_yaml(inf, encoding="UTF-8", process_string=None, backend="auto", stats=None):
     """
     Read a YAML object, possibly holding a XML plain object.
 
@@ -605,19 +2922,31 @@ def obj_from_yaml(inf, encoding="UTF-8", process_string=None):
     OrderedDict such that the XML plain object elements
     are kept in order.
 
-    :param inf: input YAML file stream or string or bytestring
+    :param inf: input YAML file stream or string or bytestring,
+      binary input may be gzip, bz2 or xz compressed
     :param encoding: encoding of the input when a byte stream or byte string
     :param process_string: a function to apply to strings (str for
         python3 or unicode for python2) after the YAML reader input
+    :param backend: the YAML backend, one of: auto, libyaml, python, where
+      "auto" selects the faster libyaml parser when available
+    :param stats: optional Stats object recording the conversion statistics
 
     :return: the constructed plain object
+
+    .. seealso: yaml_backend()
     """
-    class LocalLoader(yaml.SafeLoader):
+    if stats != None:
+        with stats.measure("yaml_load"):
+            return obj_from_yaml(_stats_input(inf, stats), encoding=encoding,
+                                 process_string=process_string, backend=backend)
+    import yaml
+    backend, SafeDumper, SafeLoader = _yaml_classes(backend)
+    class LocalLoader(SafeLoader):
         def map_constructor(self, node):
             self.flatten_mapping(node)
             return OrderedDict(self.construct_pairs(node))
         def str_constructor(self, node):
-            value = yaml.SafeLoader.construct_yaml_str(self, node)
+            value = SafeLoader.construct_yaml_str(self, node)
             encoded = False
             if sys.version_info[0] == 2 and isinstance(value, bytes):
                 encoded = True
@@ -630,9 +2959,10 @@ def obj_from_yaml(inf, encoding="UTF-8", process_string=None):
     LocalLoader.add_constructor('tag:yaml.org,2002:map', LocalLoader.map_constructor)
     LocalLoader.add_constructor('tag:yaml.org,2002:str', LocalLoader.str_constructor)
 
+    inf = _decompressed_input(inf)
     # Yaml assume utf-8/utf-16 encoding only on reading,
     # hence decode first if the requested encoding is not utf-8
-    if encoding.upper != "UTF-8":
+    if encoding.upper() != "UTF-8":
         if hasattr(inf, 'read'):
             inf = inf.read()
         if isinstance(inf, bytes):
@@ -641,39 +2971,409 @@ def obj_from_yaml(inf, encoding="UTF-8", process_string=None):
 
 
 
-if __name__ == "__main__":
-    import argparse, sys, os
-    if "--doctest" in sys.argv:
-        import doctest
-        test = doctest.testmod()
-        sys.exit(0 if test.failed == 0 else 1)
-    parser = argparse.ArgumentParser()
-    parser.add_argument('--version', action='version', version='xmlplain version %s (path: %s, python: %s)' % (__version__, __file__, sys.version.split()[0]))
-    parser.add_argument("--doctest", action="store_true", help="run documentation tests")
-    parser.add_argument("--test", action="store_true", help="run in test mode, filter exceptions")
-    parser.add_argument("--string", action="store_true", help="read from or write to string first")
-    parser.add_argument("--in-process", nargs=2, help="2 arguments 'str_in' 'str_out' for processing on read")
-    parser.add_argument("--out-process", nargs=2, help="2 arguments 'str_in' 'str_out' for processing on write")
-    parser.add_argument("--in-encoding", default="UTF-8", help="encoding for input")
-    parser.add_argument("--out-encoding", default="UTF-8", help="encoding for output")
-    parser.add_argument("--bin", action="store_true", help="read from or write to byte stream or string")
-    parser.add_argument("--inf", default="xml", help="input format, one of: xml, yml, evt (default: xml)")
-    parser.add_argument("--outf", default="xml", help="output format, one of: xml, yml, evt, py (default: xml)")
-    parser.add_argument("--pretty", action='store_true', help="pretty parse/unparse")
-    parser.add_argument("--filter", default="obj", help="intermefdiate filter, one of: obj, evt (default: obj)")
-    parser.add_argument("input", nargs='?', help="input file or stdin")
-    parser.add_argument("output", nargs='?', help="output file or stdout")
-    args = parser.parse_args()
-    if args.inf not in ["xml", "yml", "py"]: parser.exit(2, "%s: error: argument to --inf is invalid\n" % parser.prog)
-    if args.outf not in ["xml", "yml", "py"]: parser.exit(2, "%s: error: argument to --outf is invalid\n" % parser.prog)
-    if args.filter not in ["obj", "evt"]: parser.exit(2, "%s: error: argument to --filter is invalid\n" % parser.prog)
-    if args.filter == "evt" and args.inf not in ["xml", "py"]: parser.exit(2, "%s: error: input format incompatible with filter\n" % parser.prog)
-    if args.filter == "evt" and args.outf not in ["xml", "py"]: parser.exit(2, "%s: error: output format incompatible with filter\n" % parser.prog)
-    if args.input == None or args.input == "-": args.input = sys.stdin
-    else: args.input = open(args.input, "rb") if args.bin else open(args.input, "r")
-    if args.output == None  or args.output == "-": args.output = sys.stdout
-    else: args.output = open(args.output, "wb") if args.bin else open(args.output, "w")
+def _iter_events_from_yaml(inf, encoding="UTF-8", process_string=None, backend="auto"):
+    """
+    Generates the XML events tuples from the YAML view of an XML plain object.
+
+    The YAML parser events are translated on the fly into the same events
+    as the ones generated by events_from_obj() for the plain object
+    that would be read by obj_from_yaml().
+    """
+    import yaml
+    backend, SafeDumper, SafeLoader = _yaml_classes(backend)
+    class Frame():
+        def __init__(self, is_map, end_name=None):
+            self.is_map = is_map
+            self.end_name = end_name
+            self.key = None
+    inf = _decompressed_input(inf)
+    # Yaml assume utf-8/utf-16 encoding only on reading,
+    # hence decode first if the requested encoding is not utf-8
+    if encoding.upper() != "UTF-8":
+        if isinstance(inf, bytes):
+            inf = inf.decode(encoding)
+        elif hasattr(inf, 'read') and isinstance(inf.read(0), bytes):
+            inf = codecs.getreader(encoding)(inf)
+    stack = []
+    for event in yaml.parse(inf, Loader=SafeLoader):
+        if isinstance(event, yaml.DocumentStartEvent):
+            yield ('[', ("",))
+        elif isinstance(event, yaml.DocumentEndEvent):
+            yield (']', ("",))
+        elif isinstance(event, yaml.CollectionEndEvent):
+            frame = stack.pop()
+            if frame.end_name != None:
+                yield ('>', (frame.end_name,))
+        elif isinstance(event, yaml.AliasEvent):
+            raise ValueError("invalid YAML alias in XML plain object: %s" % event.anchor)
+        elif isinstance(event, yaml.NodeEvent):
+            is_scalar = isinstance(event, yaml.ScalarEvent)
+            is_map = isinstance(event, yaml.MappingStartEvent)
+            if is_scalar:
+                value = event.value
+                if process_string != None:
+                    value = process_string(value)
+            if len(stack) == 0:
+                if not is_map:
+                    raise ValueError("invalid XML plain object root, must be a dict")
+                stack.append(Frame(is_map))
+            elif stack[-1].is_map and stack[-1].key == None:
+                if not is_scalar:
+                    raise ValueError("invalid XML plain object dict key, must be a string")
+                stack[-1].key = value
+            elif stack[-1].is_map:
+                name, stack[-1].key = stack[-1].key, None
+                if name[0] == "@":
+                    if not is_scalar:
+                        raise ValueError("invalid XML plain object attribute value, must be a string")
+                    yield ('@', (name[1:], value))
+                elif is_scalar:
+                    yield ('<', (name,))
+                    yield ('|', (value,))
+                    yield ('>', (name,))
+                else:
+                    yield ('<', (name,))
+                    stack.append(Frame(is_map, end_name=name))
+            elif is_scalar:
+                yield ('|', (value,))
+            else:
+                stack.append(Frame(is_map))
+
+
+def yaml_to_xml_stream(inf, outf=None, encoding="UTF-8", process_string=None, out_encoding="UTF-8",
+                       pretty=True, indent="  ", process_content=None, backend="auto", writer="sax",
+                       stats=None):
+    """
+    Output the XML for a YAML view of a plain object without building it.
+
+    The YAML parser events are translated on the fly into XML events
+    for xml_from_events(), such that the output is the same as the one
+    of xml_from_obj() for the plain object read by obj_from_yaml(),
+    though the dict/list/string plain object is never built.
+
+    :param inf: input YAML file stream or string or bytestring,
+      binary input may be gzip, bz2 or xz compressed
+    :param outf: output file stream or None for bytestring output
+    :param encoding: encoding of the input when a byte stream or byte string
+    :param process_string: a function to apply to strings (str for
+        python3 or unicode for python2) after the YAML reader input
+    :param out_encoding: the output encoding (default to "UTF-8")
+    :param pretty: does indentation when True
+    :param indent: base indent string (default to 2-space)
+    :param process_content: a function to apply to the cdata content (str for
+        python3 or unicode for python2) before being processed by the XML
+        writer
+    :param backend: the YAML backend, one of: auto, libyaml, python
+    :param writer: the XML writer, one of: sax, fast (default: sax)
+    :param stats: optional Stats object recording the conversion statistics
+
+    :return: created byte string when outf if None
+
+    :Example:
+
+    >>> import xmlplain, sys
+    >>> xmlplain.yaml_to_xml_stream(open("tests/example-1.p.yml.ref"), sys.stdout)
+    <?xml version="1.0" encoding="UTF-8"?>
+    <example>
+      <doc>This is an example for xmlobj documentation. </doc>
+      <content version="beta">
+        <kind>document</kind>
+        <class>example</class>
+        <structured></structured>
+        <elements>
+          <item>Elt 1</item>
+          <doc>Elt 2</doc>
+          <item>Elt 3</item>
+          <doc>Elt 4</doc>
+        </elements>
+      </content>
+    </example>
+
+    .. seealso: obj_from_yaml(), xml_from_obj()
+    """
+    if stats != None: inf = _stats_input(inf, stats)
+    events = _iter_events_from_yaml(inf, encoding=encoding,
+                                    process_string=process_string,
+                                    backend=backend)
+    if stats != None: events = _iter_stats_stage(stats, "yaml_load", events)
+    if pretty: events = events_filter_pretty(events, indent=indent)
+    if stats != None and pretty: events = _iter_stats_stage(stats, "pretty", events)
+    return xml_from_events(events, outf, encoding=out_encoding, process_content=process_content, writer=writer,
+                           stats=stats)
+
+
+def xml_to_yaml_stream(inf, outf=None, encoding="UTF-8", strip_space=False, process_content=None,
+                       process_string=None, out_encoding="UTF-8", engine="sax", backend="auto", stats=None):
+    """
+    Output the YAML view of an XML input without building the plain object.
+
+    The XML events are translated on the fly into YAML emitter events,
+    such that the output is the same as the one of obj_to_yaml() for
+    the plain object generated by xml_to_obj() without the fold_dict
+    option.
+    The memory used is proportional to the document depth, except for
+    elements whose first child is an element: as the YAML layout of an
+    element with a single child differs from the one with several
+    children, the first child XML events are held in an EventBuffer
+    until the next child is parsed.
+
+    :param inf: input XML stream file or string or bytestring,
+      binary input may be gzip, bz2 or xz compressed
+    :param outf: output file stream or None for bytestring output
+    :param encoding: encoding used when the input is bytes string
+    :param strip_space: strip spaces from non-leaf text content
+    :param process_content: a function to apply to the cdata content (str for
+        python3 or unicode for python2) after the XML reader content generation
+    :param process_string: a function to apply to strings (str for
+        python3 or unicode for python2) before the YAML writer output
+    :param out_encoding: output bytestring or file stream encoding
+    :param engine: the XML parser engine, one of: sax, expat (default: sax)
+    :param backend: the YAML backend, one of: auto, libyaml, python
+    :param stats: optional Stats object recording the conversion statistics
+
+    :return: None or the generated byte string if outf is None
+
+    :Example:
+
+    >>> import xmlplain, sys
+    >>> xmlplain.xml_to_yaml_stream(open("tests/example-1.xml"), sys.stdout, strip_space=True, backend="python")
+    example:
+    - doc: 'This is an example for xmlobj documentation. '
+    - content:
+      - '@version': beta
+      - kind: document
+      - class: example
+      - structured: ''
+      - elements:
+        - item: Elt 1
+        - doc: Elt 2
+        - item: Elt 3
+        - doc: Elt 4
+
+    .. seealso: xml_to_obj(), obj_to_yaml()
+    """
+    import yaml
+    class Frame():
+        def __init__(self, sink, direct=False):
+            self.sink = sink # receiver of the element value events
+            self.direct = direct # children events are passed as is
+            self.sequence = False # the value is known to be a sequence
+            self.count = 0 # number of children
+            self.present = 0 # number of children remaining after strip
+            self.held = [] # children held until the value layout is known
+            self.text = []
+    class YamlEventsGenerator():
+        def __init__(self, dumper, strip_space=False, process_string=None):
+            self.dumper = dumper
+            self.strip_space = strip_space
+            self.process_string = process_string
+            self.capture = None # XML events buffer of the held child and its depth
+        def scalar(self, value):
+            if self.process_string != None:
+                value = self.process_string(value)
+            # Same events as for the obj_to_yaml() dumper
+            tag = 'tag:yaml.org,2002:str'
+            implicit = (self.dumper.resolve(yaml.ScalarNode, value, (True, False)) == tag,
+                        self.dumper.resolve(yaml.ScalarNode, value, (False, True)) == tag)
+            style = '|' if value.find('\n') >= 0 else None
+            return yaml.ScalarEvent(None, tag, implicit, value, style=style)
+        def gen_mapping(self, sink, key, value):
+            sink(yaml.MappingStartEvent(None, None, True, flow_style=False))
+            sink(self.scalar(key))
+            if value != None:
+                sink(self.scalar(value))
+                sink(yaml.MappingEndEvent())
+        def gen_held(self, frame, held):
+            kind, value = held
+            if kind == 'text':
+                if self.strip_space and frame.count > 1:
+                    value = value.strip()
+                    if value == "": return
+                frame.sink(self.scalar(value))
+            elif kind == 'attr':
+                self.gen_mapping(frame.sink, '@%s' % value[0], value[1])
+            else:
+                # The held element XML events are converted now that
+                # the layout is known, with their own frames stack
+                stack = self.stack
+                self.stack = [Frame(frame.sink, direct=True)]
+                for event in value: self.append(event)
+                self.stack = stack
+        def add_present(self, frame):
+            if frame.direct: return
+            frame.present += 1
+            if frame.present == 2 and not frame.sequence:
+                frame.sequence = True
+                frame.sink(yaml.SequenceStartEvent(None, None, True, flow_style=False))
+                for held in frame.held: self.gen_held(frame, held)
+                frame.held = []
+        def end_text(self, frame):
+            if len(frame.text) == 0: return
+            text = "".join(frame.text)
+            del frame.text[:]
+            if not self.strip_space or text.strip() != "":
+                self.add_present(frame)
+            if frame.sequence:
+                self.gen_held(frame, ('text', text))
+            else:
+                frame.held.append(('text', text))
+        def end_value(self, frame):
+            if frame.sequence:
+                frame.sink(yaml.SequenceEndEvent())
+                return
+            held = frame.held
+            if self.strip_space and frame.count > 1:
+                held = [h for h in held if h[0] != 'text' or h[1].strip() != ""]
+            if len(held) == 0:
+                frame.sink(self.scalar(""))
+            elif len(held) == 1:
+                self.gen_held(frame, held[0])
+            else:
+                frame.sink(yaml.SequenceStartEvent(None, None, True, flow_style=False))
+                for h in held: self.gen_held(frame, h)
+                frame.sink(yaml.SequenceEndEvent())
+        def append(self, event):
+            kind, value = event
+            if self.capture != None:
+                # Events of a held child are kept as compact XML events
+                self.capture[0].append(event)
+                if kind == '<': self.capture[1] += 1
+                elif kind == '>':
+                    self.capture[1] -= 1
+                    if self.capture[1] == 0: self.capture = None
+                return
+            if kind == '[':
+                self.dumper.emit(yaml.DocumentStartEvent(explicit=False))
+                self.stack = [Frame(self.dumper.emit, direct=True)]
+                return
+            if kind == ']':
+                self.dumper.emit(yaml.DocumentEndEvent(explicit=False))
+                return
+            frame = self.stack[-1]
+            if kind == '|':
+                if len(frame.text) == 0: frame.count += 1
+                frame.text.append(value[0])
+                return
+            if kind not in ['<', '>', '@']: return
+            self.end_text(frame)
+            if kind == '<':
+                frame.count += 1
+                self.add_present(frame)
+                if frame.direct or frame.sequence:
+                    self.gen_mapping(frame.sink, value[0], None)
+                    self.stack.append(Frame(frame.sink))
+                else:
+                    buffer = EventBuffer()
+                    buffer.append(event)
+                    frame.held.append(('element', buffer))
+                    self.capture = [buffer, 1]
+            elif kind == '>':
+                self.end_value(frame)
+                frame.sink(yaml.MappingEndEvent())
+                self.stack.pop()
+            elif kind == '@':
+                frame.count += 1
+                self.add_present(frame)
+                if frame.direct or frame.sequence:
+                    self.gen_mapping(frame.sink, '@%s' % value[0], value[1])
+                else:
+                    frame.held.append(('attr', value))
+    backend, SafeDumper, SafeLoader = _yaml_classes(backend)
+    getvalue = None
+    if outf == None:
+        outf = io.BytesIO()
+        getvalue = outf.getvalue
+    if stats != None:
+        outf = _StatsStream(outf, stats)
+    dumper = SafeDumper(outf, default_flow_style=False, allow_unicode=True,
+                        encoding=out_encoding)
+    try:
+        dumper.open()
+        generator = YamlEventsGenerator(dumper, strip_space=strip_space,
+                                        process_string=process_string)
+        xml_to_events(inf, generator if stats == None else
+                      _StatsHandler(stats, generator, "yaml_dump", stats.events_in),
+                      encoding=encoding, process_content=process_content,
+                      engine=engine, stats=stats)
+        dumper.close()
+    finally:
+        dumper.dispose()
+    if getvalue:
+        return getvalue()
+
+
+
+_async_names = ["axml_to_events", "axml_to_obj", "axml_from_events", "axml_from_obj"]
 
+
+def __getattr__(name):
+    """
+    Returns the asyncio functions of the xmlplain_async module,
+    loaded on first access with python 3.7 or later.
+    """
+    if name in _async_names and sys.version_info >= (3, 7):
+        import xmlplain_async
+        return getattr(xmlplain_async, name)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def _main_convert(args):
+    """
+    Converts the args.input file to the args.output file as specified
+    by the command line arguments.
+    """
+    def open_input(name):
+        if args.mmap and args.inf in ["xml", "evt"] and not args.string and name not in [None, "-"]:
+            # The input file is parsed from a memory map of the file
+            try:
+                import pathlib
+                return pathlib.Path(name)
+            except ImportError: # pragma: no cover
+                pass # Python 2 has no pathlib, the file is read as a stream
+        # Compressed input is detected from the magic bytes
+        binf = getattr(sys.stdin, "buffer", None) if name in [None, "-"] else open(name, "rb")
+        if binf != None:
+            inf = _decompressed_input(binf)
+            if inf is not binf:
+                return inf if binary_in else io.TextIOWrapper(inf, encoding=args.in_encoding)
+            # The binary events format is read from the binary stream
+            if args.inf == "evt": return binf
+        if name in [None, "-"]: return sys.stdin
+        binf.close()
+        return open(name, "rb") if binary_in else open(name, "r")
+    def open_output(name):
+        # Compressed output is selected from --compress or the file extension
+        compression = args.compress
+        if compression == "auto":
+            compression = compression_from_name(name) if name not in [None, "-"] else None
+        if compression in [None, "none"]:
+            if name in [None, "-"]:
+                return getattr(sys.stdout, "buffer", sys.stdout) if args.outf == "evt" else sys.stdout
+            return open(name, "wb") if binary_out else open(name, "w")
+        if name in [None, "-"]:
+            outf = _compressed_stream(getattr(sys.stdout, "buffer", sys.stdout), "wb", compression)
+        else:
+            outf = open_compressed(name, "wb", compression)
+        return outf if binary_out else io.TextIOWrapper(outf, encoding=args.out_encoding)
+    # The binary events format is always read and written as bytes
+    binary_in = args.bin or args.inf == "evt"
+    binary_out = args.bin or args.outf == "evt"
+    args.input = inf = open_input(args.input)
+    args.output = open_output(args.output)
+    try:
+        _main_process(args)
+    finally:
+        if args.output not in [sys.stdout, getattr(sys.stdout, "buffer", None)]:
+            args.output.close()
+        if inf not in [sys.stdin, getattr(sys.stdin, "buffer", None)] and not _is_path(inf):
+            inf.close()
+
+
+def _main_process(args):
+    """
+    Converts the args.input stream to the args.output stream as specified
+    by the command line arguments.
+    """
     in_process = None
     if args.in_process:
         in_process = lambda x: x.replace(args.in_process[0], args.in_process[1])
@@ -691,50 +3391,291 @@ if __name__ == "__main__":
             args.input = args.input.read()
             if not args.bin and isinstance(args.input, bytes):
                 args.input = args.input.decode(args.in_encoding)
-        if args.filter == "evt":
+        if args.filter == "evt" and args.outf == "yml":
+            pass # XML events are streamed to the YAML output
+        elif args.filter == "evt":
             if not args.test:
-                events = xml_to_events(args.input, process_content=in_process, encoding=args.in_encoding)
+                events = xml_to_events(args.input, process_content=in_process, encoding=args.in_encoding,
+                                       engine=args.engine, stats=args.stats)
             else:
                 try:
-                    events = xml_to_events(args.input, process_content=in_process, encoding=args.in_encoding)
+                    events = xml_to_events(args.input, process_content=in_process, encoding=args.in_encoding,
+                                           engine=args.engine, stats=args.stats)
                 except Exception as e:
-                    events = events_from_obj({ "exception": str(e).encode("utf-8").decode("utf-8")})
+                    events = list(events_from_obj({ "exception": str(e).encode("utf-8").decode("utf-8")}))
         else:
             if not args.test:
                 root = xml_to_obj(args.input, strip_space=args.pretty, fold_dict=args.pretty,
-                                  process_content=in_process, encoding=args.in_encoding)
+                                  process_content=in_process, encoding=args.in_encoding,
+                                  engine=args.engine, lazy=args.lazy, stats=args.stats,
+                                  cache_dir=args.cache_dir, max_bytes=args.cache_max_bytes,
+                                  jobs=args.jobs, shard_size=args.shard_size)
             else:
                 try:
                     root = xml_to_obj(args.input, strip_space=args.pretty, fold_dict=args.pretty,
-                                      process_content=in_process, encoding=args.in_encoding)
+                                      process_content=in_process, encoding=args.in_encoding,
+                                      engine=args.engine, lazy=args.lazy, stats=args.stats,
+                                      cache_dir=args.cache_dir, max_bytes=args.cache_max_bytes,
+                                      jobs=args.jobs, shard_size=args.shard_size)
                 except Exception as e:
                     root = { "exception": str(e).encode("utf-8").decode("utf-8")}
+    elif args.inf == "evt":
+        if args.string:
+            args.input = args.input.read()
+        if args.filter == "evt":
+            events = iter_evt_events(args.input)
+        else:
+            root = evt_to_obj(args.input, strip_space=args.pretty, fold_dict=args.pretty)
     elif args.inf == "yml":
         if args.string:
             args.input = args.input.read()
             if not args.bin and isinstance(args.input, bytes):
                 args.input = args.input.decode(args.in_encoding)
-        root = obj_from_yaml(args.input, encoding=args.in_encoding, process_string=in_process)
+        if args.filter == "evt":
+            pass # YAML events are streamed to the XML output
+        else:
+            root = obj_from_yaml(args.input, encoding=args.in_encoding, process_string=in_process,
+                                 backend=args.yaml_backend, stats=args.stats)
     if args.outf == "xml":
         if args.filter == "obj":
             if args.string:
-                string = xml_from_obj(root, outf=None, pretty=args.pretty, process_content=out_process, encoding=args.out_encoding)
+                string = xml_from_obj(root, outf=None, pretty=args.pretty, process_content=out_process, encoding=args.out_encoding,
+                                      writer=args.writer, stats=args.stats)
+                if sys.version_info[0] >= 3 and args.bin == False: string = string.decode(args.out_encoding)
+                args.output.write(string)
+            else:
+                xml_from_obj(root, args.output, pretty=args.pretty, process_content=out_process, encoding=args.out_encoding,
+                             writer=args.writer, stats=args.stats)
+        elif args.inf == "yml":
+            if args.string:
+                string = yaml_to_xml_stream(args.input, None, encoding=args.in_encoding, process_string=in_process,
+                                            out_encoding=args.out_encoding, pretty=args.pretty,
+                                            process_content=out_process, backend=args.yaml_backend,
+                                            writer=args.writer, stats=args.stats)
                 if sys.version_info[0] >= 3 and args.bin == False: string = string.decode(args.out_encoding)
                 args.output.write(string)
             else:
-                xml_from_obj(root, args.output, pretty=args.pretty, process_content=out_process, encoding=args.out_encoding)
+                yaml_to_xml_stream(args.input, args.output, encoding=args.in_encoding, process_string=in_process,
+                                   out_encoding=args.out_encoding, pretty=args.pretty,
+                                   process_content=out_process, backend=args.yaml_backend,
+                                   writer=args.writer, stats=args.stats)
         else:
-            xml_from_events(events, args.output, process_content=out_process, encoding=args.out_encoding)
+            xml_from_events(events, args.output, process_content=out_process, encoding=args.out_encoding,
+                            writer=args.writer, stats=args.stats)
     elif args.outf == "yml":
         if args.filter == "obj":
             if args.string:
-                string = obj_to_yaml(root, outf=None, encoding=args.out_encoding, process_string=out_process)
+                string = obj_to_yaml(root, outf=None, encoding=args.out_encoding, process_string=out_process,
+                                     backend=args.yaml_backend, stats=args.stats)
+                if sys.version_info[0] >= 3 and args.bin == False: string = string.decode(args.out_encoding)
+                args.output.write(string)
+            else:
+                obj_to_yaml(root, args.output, encoding=args.out_encoding, process_string=out_process,
+                            backend=args.yaml_backend, stats=args.stats)
+        else:
+            if args.string or args.test:
+                try:
+                    string = xml_to_yaml_stream(args.input, None, process_content=in_process, encoding=args.in_encoding,
+                                                process_string=out_process, out_encoding=args.out_encoding,
+                                                engine=args.engine, backend=args.yaml_backend, stats=args.stats)
+                except Exception as e:
+                    if not args.test: raise
+                    string = obj_to_yaml({ "exception": str(e).encode("utf-8").decode("utf-8")},
+                                         outf=None, encoding=args.out_encoding, process_string=out_process,
+                                         backend=args.yaml_backend)
                 if sys.version_info[0] >= 3 and args.bin == False: string = string.decode(args.out_encoding)
                 args.output.write(string)
             else:
-                obj_to_yaml(root, args.output, encoding=args.out_encoding, process_string=out_process)
+                xml_to_yaml_stream(args.input, args.output, process_content=in_process, encoding=args.in_encoding,
+                                   process_string=out_process, out_encoding=args.out_encoding,
+                                   engine=args.engine, backend=args.yaml_backend, stats=args.stats)
+    elif args.outf == "evt":
+        if args.filter == "obj":
+            events = events_from_obj(root)
+            if args.pretty: events = events_filter_pretty(events)
+        if args.string:
+            args.output.write(evt_from_events(events))
+        else:
+            evt_from_events(events, args.output)
     elif args.outf == "py":
         if args.filter == "obj":
             args.output.write(str(root))
         else:
-            args.output.write(str(events))
+            args.output.write(str(list(events)))
+
+
+def _main_batch_tasks(args):
+    """
+    Returns the list of (args, input, output) files conversions for the
+    batch mode, the inputs being either the files of the args.input
+    directory tree with the --inf format extension or the files listed on
+    stdin, converted into the args.output directory.
+    """
+    import os
+    in_exts = {"xml": [".xml"], "yml": [".yml", ".yaml"], "py": [".py"], "evt": [".evt"]}[args.inf]
+    out_ext = "." + args.outf
+    if args.compress not in ["auto", "none"]:
+        out_ext += _compressions[args.compress]
+    def output_name(rel):
+        compression = compression_from_name(rel)
+        if compression != None:
+            rel = rel[:-len(_compressions[compression])]
+        stem, ext = os.path.splitext(rel)
+        if ext in in_exts: rel = stem
+        return os.path.join(args.output, rel + out_ext)
+    tasks = []
+    if args.input in [None, "-"]:
+        for line in sys.stdin:
+            path = line.strip()
+            if path == "": continue
+            rel = os.path.normpath(path).lstrip(os.sep)
+            if rel.split(os.sep)[0] == os.pardir:
+                raise ValueError("invalid relative path in batch files list: %s" % path)
+            tasks.append((args, path, output_name(rel)))
+    else:
+        for dirpath, dirnames, filenames in os.walk(args.input):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                name = filename
+                compression = compression_from_name(name)
+                if compression != None:
+                    name = name[:-len(_compressions[compression])]
+                if os.path.splitext(name)[1] not in in_exts: continue
+                path = os.path.join(dirpath, filename)
+                tasks.append((args, path, output_name(os.path.relpath(path, args.input))))
+    return tasks
+
+
+def _main_batch_convert(task):
+    """
+    Converts a single batch mode file, returns the tuple
+    (path, size, error) where error is None on success.
+    """
+    import os, copy
+    args, path, output = task
+    args = copy.copy(args)
+    # Files are dispatched to the jobs, each file being parsed serially
+    args.input, args.output, args.jobs = path, output, 1
+    try:
+        size = os.path.getsize(path)
+        dirname = os.path.dirname(output)
+        if dirname != "" and not os.path.isdir(dirname):
+            try:
+                os.makedirs(dirname)
+            except OSError:
+                # May be concurrently created by another worker
+                if not os.path.isdir(dirname): raise
+        _main_convert(args)
+    except Exception as e:
+        # Do not leave a partial output for the failed conversion
+        if os.path.isfile(output): os.remove(output)
+        return (path, 0, str(e) or e.__class__.__name__)
+    return (path, size, None)
+
+
+def _main_batch(args, prog="xmlplain"):
+    """
+    Converts in batch mode the files as specified by the command line
+    arguments, dispatched to args.jobs worker processes, and reports
+    errors and throughput on stderr.
+
+    :return: the exit code, 1 when some conversion failed
+    """
+    import multiprocessing
+    start = time.time()
+    tasks = _main_batch_tasks(args)
+    jobs = args.jobs if args.jobs > 0 else multiprocessing.cpu_count()
+    jobs = max(1, min(jobs, len(tasks)))
+    if jobs > 1:
+        try:
+            from concurrent.futures import ProcessPoolExecutor
+        except ImportError: # pragma: no cover
+            jobs = 1 # Python 2 has no concurrent.futures, files are converted serially
+    if jobs == 1:
+        results = map(_main_batch_convert, tasks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        # Dispatch files by chunks in order to amortize the IPC cost
+        chunksize = max(1, min(64, len(tasks) // (jobs * 8)))
+        results = executor.map(_main_batch_convert, tasks, chunksize=chunksize)
+    try:
+        errors, size = 0, 0
+        for path, path_size, error in results:
+            size += path_size
+            if error != None:
+                errors += 1
+                sys.stderr.write("%s: error: %s: %s\n" % (prog, path, error))
+    finally:
+        if executor != None: executor.shutdown()
+    elapsed = max(time.time() - start, 1e-6)
+    sys.stderr.write("%s: converted %d files (%d bytes) in %.3f secs with %d jobs: %.1f files/s, %.2f MB/s, %d errors\n" %
+                     (prog, len(tasks) - errors, size, elapsed, jobs,
+                      (len(tasks) - errors) / elapsed, size / elapsed / 1e6, errors))
+    return 1 if errors > 0 else 0
+
+
+if __name__ == "__main__":
+    import argparse, sys, os
+    if "--doctest" in sys.argv:
+        import doctest
+        failed = doctest.testmod().failed
+        if sys.version_info >= (3, 7):
+            import xmlplain_async
+            failed += doctest.testmod(xmlplain_async).failed
+        sys.exit(0 if failed == 0 else 1)
+    class VersionAction(argparse.Action):
+        # The version message is formatted on use as yaml is imported for it
+        def __call__(self, parser, namespace, values, option_string=None):
+            parser.exit(message='xmlplain version %s (path: %s, python: %s, yaml: %s)\n' % (__version__, __file__, sys.version.split()[0], yaml_backend()))
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--version', action=VersionAction, nargs=0, help="show program's version number and exit")
+    parser.add_argument("--doctest", action="store_true", help="run documentation tests")
+    parser.add_argument("--test", action="store_true", help="run in test mode, filter exceptions")
+    parser.add_argument("--string", action="store_true", help="read from or write to string first")
+    parser.add_argument("--in-process", nargs=2, help="2 arguments 'str_in' 'str_out' for processing on read")
+    parser.add_argument("--out-process", nargs=2, help="2 arguments 'str_in' 'str_out' for processing on write")
+    parser.add_argument("--in-encoding", default="UTF-8", help="encoding for input")
+    parser.add_argument("--out-encoding", default="UTF-8", help="encoding for output")
+    parser.add_argument("--bin", action="store_true", help="read from or write to byte stream or string")
+    parser.add_argument("--inf", default="xml", help="input format, one of: xml, yml, py, evt (default: xml)")
+    parser.add_argument("--outf", default="xml", help="output format, one of: xml, yml, evt, py (default: xml)")
+    parser.add_argument("--pretty", action='store_true', help="pretty parse/unparse")
+    parser.add_argument("--filter", default="obj", help="intermediate filter, one of: obj, evt (default: obj, which builds the full plain object, also for XML to YAML conversions, evt streams XML to YAML conversions without --pretty)")
+    parser.add_argument("--mmap", action="store_true", help="parse the XML or evt input file from a memory map of the file")
+    parser.add_argument("--lazy", action="store_true", help="parse the XML input to a lazy plain object view")
+    parser.add_argument("--engine", default="sax", help="XML parser engine, one of: sax, expat (default: sax)")
+    parser.add_argument("--writer", default="sax", help="XML writer, one of: sax, fast (default: sax)")
+    parser.add_argument("--compress", default="auto", help="output compression, one of: auto, none, gzip, bz2, xz (default: auto, from output file extension)")
+    parser.add_argument("--yaml-backend", default="auto", help="YAML backend, one of: auto, libyaml, python (default: auto)")
+    parser.add_argument("--cache-dir", help="directory of the cache of the parsed XML inputs (default: no cache)")
+    parser.add_argument("--cache-max-bytes", type=int, help="maximum size in bytes of the parse cache (default: unbounded)")
+    parser.add_argument("--stats", action="store_true", help="print the conversion statistics to stderr")
+    parser.add_argument("--stats-memory", action="store_true", help="print the conversion statistics to stderr, with the peak memory traced by tracemalloc, which slows down the conversion")
+    parser.add_argument("--batch", action="store_true", help="batch mode, convert the input directory files (or files listed on stdin) into the output directory")
+    parser.add_argument("--jobs", type=int, help="number of parallel jobs, converting files in batch mode or else parsing the XML input shards, 0 for the number of CPUs (default: 0 in batch mode, else 1)")
+    parser.add_argument("--shard-size", type=int, default=_shard_size, help="approximative size of the XML input shards parsed in parallel (default: %d)" % _shard_size)
+    parser.add_argument("input", nargs='?', help="input file or stdin")
+    parser.add_argument("output", nargs='?', help="output file or stdout")
+    args = parser.parse_args()
+    if args.inf not in ["xml", "yml", "py", "evt"]: parser.exit(2, "%s: error: argument to --inf is invalid\n" % parser.prog)
+    if args.outf not in ["xml", "yml", "py", "evt"]: parser.exit(2, "%s: error: argument to --outf is invalid\n" % parser.prog)
+    if args.filter not in ["obj", "evt"]: parser.exit(2, "%s: error: argument to --filter is invalid\n" % parser.prog)
+    if args.engine not in ["sax", "expat"]: parser.exit(2, "%s: error: argument to --engine is invalid\n" % parser.prog)
+    if args.writer not in ["sax", "fast"]: parser.exit(2, "%s: error: argument to --writer is invalid\n" % parser.prog)
+    if args.compress not in ["auto", "none"] + list(_compressions): parser.exit(2, "%s: error: argument to --compress is invalid\n" % parser.prog)
+    if args.yaml_backend not in ["auto", "libyaml", "python"]: parser.exit(2, "%s: error: argument to --yaml-backend is invalid\n" % parser.prog)
+    if args.filter == "evt" and args.inf not in ["xml", "yml", "py", "evt"]: parser.exit(2, "%s: error: input format incompatible with filter\n" % parser.prog)
+    if args.filter == "evt" and args.inf == "yml" and args.outf != "xml": parser.exit(2, "%s: error: output format incompatible with filter and input format\n" % parser.prog)
+    if args.filter == "evt" and args.outf not in ["xml", "yml", "py", "evt"]: parser.exit(2, "%s: error: output format incompatible with filter\n" % parser.prog)
+    if args.filter == "evt" and args.outf == "yml" and args.inf != "xml": parser.exit(2, "%s: error: input format incompatible with filter and output format\n" % parser.prog)
+    if args.filter == "evt" and args.outf == "yml" and args.pretty: parser.exit(2, "%s: error: pretty output incompatible with filter and output format\n" % parser.prog)
+    if args.batch and args.output in [None, "-"]: parser.exit(2, "%s: error: output directory required in batch mode\n" % parser.prog)
+    if args.batch and (args.stats or args.stats_memory): parser.exit(2, "%s: error: statistics not available in batch mode\n" % parser.prog)
+    args.stats = Stats(trace_memory=args.stats_memory) if args.stats or args.stats_memory else None
+    if args.jobs == None: args.jobs = 0 if args.batch else 1
+    if args.batch:
+        sys.exit(_main_batch(args, prog=parser.prog))
+    _main_convert(args)
+    if args.stats != None:
+        args.stats.dump(sys.stderr)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+#
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# For more information, please refer to <http://unlicense.org/>
+#
+
+"""
+Asyncio counterparts of the xmlplain module conversion functions.
+
+These functions read the XML input from an asyncio.StreamReader or an
+async iterable of chunks and write the XML output to an async writer,
+yielding control to the event loop between each chunk such that the
+conversion of a large document does not starve the event loop.
+
+This module requires python 3.7 or later, the functions are also
+available as attributes of the xmlplain module.
+
+:Example:
+
+>>> import asyncio, xmlplain
+>>> async def convert(data):
+...     reader = asyncio.StreamReader()
+...     reader.feed_data(data)
+...     reader.feed_eof()
+...     return await xmlplain.axml_to_obj(reader, chunk_size=8)
+>>> asyncio.run(convert(b'<doc kind="example">text</doc>'))
+{'doc': [{'@kind': 'example'}, 'text']}
+"""
+
+import asyncio
+import inspect
+
+import xmlplain
+
+__all__ = ["axml_to_events", "axml_to_obj", "axml_from_events", "axml_from_obj"]
+
+
+async def _aiter_xml_chunks(inf, chunk_size=65536):
+    """
+    Generates the successive chunks of data to be fed to the XML parser.
+
+    Stream readers with a read() coroutine are read by chunks of chunk_size,
+    async iterables chunks are passed as is, other inputs are processed as
+    for xmlplain.iter_xml_events().
+    """
+    if hasattr(inf, 'read') and inspect.iscoroutinefunction(inf.read):
+        while True:
+            chunk = await inf.read(chunk_size)
+            if not chunk: break
+            yield chunk
+    elif hasattr(inf, '__aiter__'):
+        async for chunk in inf:
+            yield chunk
+    else:
+        for chunk in xmlplain._iter_xml_chunks(inf, chunk_size=chunk_size):
+            yield chunk
+
+
+async def axml_to_events(inf, handler=None, encoding="UTF-8", process_content=None, coalesce=False,
+                         chunk_size=65536, engine="sax"):
+    """
+    Generates XML events tuples from the async input stream.
+
+    This is the asyncio counterpart of xmlplain.xml_to_events(), the input
+    is fed by chunks to the incremental parser, the events being appended
+    to the handler while parsing.
+
+    :param inf: input asyncio.StreamReader, or any object with a read(size)
+      coroutine, or async iterable of bytes or str chunks, or string or bytestring
+    :param handler: events receiver implementing the append() method or None,
+      in which case a new list will be generated
+    :param encoding: encoding used when the input is a bytes string
+    :param process_content: a function to apply to the cdata content (str for
+        python3 or unicode for python2) after the XML reader content generation
+    :param coalesce: when True, consecutive contents generated by the XML
+      reader are joined and generated as a single content event
+    :param chunk_size: size of the chunks read from a stream reader
+    :param engine: the XML parser engine, one of: sax, expat (default: sax)
+
+    :return: returns the handler or the generated list
+
+    :Example:
+
+    >>> import asyncio, xmlplain_async
+    >>> asyncio.run(xmlplain_async.axml_to_events('<doc>text</doc>'))
+    [('[', ('',)), ('<', ('doc',)), ('|', ('text',)), ('>', ('doc',)), (']', ('',))]
+
+    .. seealso: xmlplain.xml_to_events(), xmlplain.iter_xml_events()
+    """
+    if handler == None: handler = []
+    # As for xmlplain.xml_to_events(), the encoding only applies to bytestrings
+    parser = xmlplain._xml_events_parser(handler, engine=engine,
+                                         encoding=encoding if isinstance(inf, bytes) else None,
+                                         process_content=process_content,
+                                         coalesce=coalesce)
+    empty = True
+    async for chunk in _aiter_xml_chunks(inf, chunk_size=chunk_size):
+        parser.feed(chunk)
+        empty = False
+        await asyncio.sleep(0)
+    if empty: parser.feed(b"")
+    parser.close()
+    return handler
+
+
+async def axml_to_obj(inf, encoding="UTF-8", strip_space=False, fold_dict=False, process_content=None,
+                      chunk_size=65536, engine="sax"):
+    """
+    Generate an plain object representation from the async XML input.
+
+    This is the asyncio counterpart of xmlplain.xml_to_obj().
+
+    :param inf: input asyncio.StreamReader, or any object with a read(size)
+      coroutine, or async iterable of bytes or str chunks, or string or bytestring
+    :param encoding: encoding used when the input is bytes string
+    :param strip_space: strip spaces from non-leaf text content
+    :param fold_dict: optimized unambiguous lists of dict into ordered dicts
+    :param process_content: a function to apply to the cdata content (str for
+        python3 or unicode for python2) after the XML reader content generation
+    :param chunk_size: size of the chunks read from a stream reader
+    :param engine: the XML parser engine, one of: sax, expat (default: sax)
+
+    :return: the root of the generated plain object, actually a single key dict
+
+    .. seealso: xmlplain.xml_to_obj()
+    """
+    generator = xmlplain._ObjGenerator(strip_space=strip_space, fold_dict=fold_dict)
+    await axml_to_events(inf, generator, encoding=encoding,
+                         process_content=process_content,
+                         chunk_size=chunk_size, engine=engine)
+    return generator.get_value()
+
+
+async def axml_from_events(events, outf=None, encoding="UTF-8", process_content=None, chunk_size=65536):
+    """
+    Outputs the XML document from the events tuples to an async writer.
+
+    This is the asyncio counterpart of xmlplain.xml_from_events(), the
+    output is the same and is written by chunks of about chunk_size bytes,
+    each write being awaited.
+
+    :param events: events tuples list or iterator
+    :param outf: output asyncio.StreamWriter, which is drained after each
+      write, or any object with a write() coroutine, or None for
+      bytestring output
+    :param encoding: output encoding
+    :param process_content: a function to apply to the cdata content (str for
+        python3 or unicode for python2) before being processed by the XML
+        writer
+    :param chunk_size: size of the chunks written to the output
+    :return: created byte string when outf if None
+
+    .. seealso: xmlplain.xml_from_events()
+    """
+    class ChunksWriter():
+        def __init__(self):
+            self.chunks = []
+        def write(self, content):
+            # Empty contents, as the initial one of the generator, are not written
+            if len(content) == 0: return
+            self.chunks.append(content)
+    async def write_chunks():
+        for chunk in writer.chunks:
+            if outf == None:
+                output.append(chunk)
+                continue
+            written = outf.write(chunk)
+            if inspect.isawaitable(written):
+                await written
+            elif hasattr(outf, 'drain'):
+                await outf.drain()
+        del writer.chunks[:]
+        await asyncio.sleep(0)
+    output = []
+    writer = ChunksWriter()
+    generator = xmlplain._FastXMLGenerator(writer, encoding=encoding,
+                                           process_content=process_content,
+                                           buffer_size=chunk_size)
+    for evt in events:
+        generator.append(evt)
+        if len(writer.chunks) > 0:
+            await write_chunks()
+    generator.flush()
+    await write_chunks()
+    if outf == None:
+        return b"".join(output)
+
+
+async def axml_from_obj(root, outf=None, encoding="UTF-8", pretty=True, indent="  ", process_content=None,
+                        chunk_size=65536):
+    """
+    Generate a XML output from a plain object to an async writer.
+
+    This is the asyncio counterpart of xmlplain.xml_from_obj().
+
+    :param root: the root of the plain object
+    :param outf: output asyncio.StreamWriter, which is drained after each
+      write, or any object with a write() coroutine, or None for
+      bytestring output
+    :param encoding: the encoding to be used (default to "UTF-8")
+    :param pretty: does indentation when True
+    :param indent: base indent string (default to 2-space)
+    :param process_content: a function to apply to the cdata content (str for
+        python3 or unicode for python2) before being processed by the XML
+        writer
+    :param chunk_size: size of the chunks written to the output
+
+    :return: created byte string when outf if None
+
+    :Example:
+
+    >>> import asyncio, xmlplain_async
+    >>> asyncio.run(xmlplain_async.axml_from_obj({"doc": {"@kind": "example", "item": "text"}}, pretty=False))
+    b'<?xml version="1.0" encoding="UTF-8"?>\\n<doc kind="example"><item>text</item></doc>'
+
+    .. seealso: xmlplain.xml_from_obj()
+    """
+    events = xmlplain.events_from_obj(root)
+    if pretty: events = xmlplain.events_filter_pretty(events, indent=indent)
+    return await axml_from_events(events, outf, encoding=encoding,
+                                  process_content=process_content,
+                                  chunk_size=chunk_size)
+
+
+if __name__ == "__main__":
+    import sys
+    if "--doctest" in sys.argv:
+        import doctest
+        test = doctest.testmod()
+        sys.exit(0 if test.failed == 0 else 1)